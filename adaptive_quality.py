@@ -0,0 +1,88 @@
+"""
+Adaptive quality for real-time rendering: step between pre-built quality levels
+(finer or coarser character grids) to hold a target frame rate.
+"""
+import math
+
+# Scale factors of the cell size (or font size) for each quality level, finest first
+QUALITY_SCALES = [1.0, 1.5, 2.0, 3.0, 4.0]
+
+
+def quality_scales(num_levels):
+    """Cell size factors for num_levels quality levels (1 = no adaptation)."""
+    if not 1 <= num_levels <= len(QUALITY_SCALES):
+        raise ValueError(f"Quality levels must be between 1 and {len(QUALITY_SCALES)}")
+    return QUALITY_SCALES[:num_levels]
+
+
+def scaled_cell_sizes(cell_w, cell_h, num_levels):
+    """(cell_w, cell_h) of each quality level, finest first."""
+    return [(max(1, math.ceil(cell_w * scale)), max(1, math.ceil(cell_h * scale))) for scale in quality_scales(num_levels)]
+
+
+class AdaptiveQuality:
+    """
+    Pick a quality level from measured per-frame render times.
+
+    Level 0 is the finest grid. Render times are smoothed with an exponential
+    moving average; when it exceeds `pressure` of the frame budget (1 / target_fps)
+    the controller moves to a coarser level. It moves back to a finer one only when
+    the average stays under `headroom` of the budget and, scaled by the finer
+    level's extra cost ((scale ratio)^2 more cells), would still stay under
+    `pressure` - otherwise a render time just over the budget would step down and
+    straight back up. After each switch the average is reset and `patience` frames
+    are measured before the next decision. Levels are built up front by the
+    caller, so switching is free.
+
+    Usage:
+        controller = AdaptiveQuality(len(levels), target_fps)
+        start = time.perf_counter()
+        render(frame, levels[controller.level])
+        controller.record(time.perf_counter() - start)
+    """
+
+    def __init__(self, num_levels, target_fps, pressure=0.9, headroom=0.5, patience=10, smoothing=0.2, scales=None):
+        self.num_levels = num_levels
+        self.scales = scales or quality_scales(num_levels)
+        self.budget = 1.0 / target_fps
+        self.pressure = pressure
+        self.headroom = headroom
+        self.patience = patience
+        self.smoothing = smoothing
+        self.level = 0
+        self.switches = 0
+        self.frames_at_level = [0] * num_levels
+        self._average = None
+        self._samples = 0
+
+    def record(self, render_time):
+        """Add the render time (seconds) of the frame just rendered. Returns the level for the next frame."""
+        self.frames_at_level[self.level] += 1
+        if self._average is None:
+            self._average = render_time
+        else:
+            self._average += self.smoothing * (render_time - self._average)
+        self._samples += 1
+
+        if self._samples >= self.patience:
+            if self._average > self.pressure * self.budget and self.level < self.num_levels - 1:
+                self._switch(self.level + 1)
+            elif self.level > 0 and self._average < self.headroom * self.budget and \
+                    self._average * self.cost_ratio(self.level) < self.pressure * self.budget:
+                self._switch(self.level - 1)
+        return self.level
+
+    def cost_ratio(self, level):
+        """Expected render cost of level - 1 relative to level (cells grow with the square of the scale)."""
+        return (self.scales[level] / self.scales[level - 1]) ** 2
+
+    def _switch(self, level):
+        self.level = level
+        self.switches += 1
+        self._average = None
+        self._samples = 0
+
+    def print_report(self):
+        total = sum(self.frames_at_level)
+        shares = ", ".join(f"{count / total:.0%}" if total else "0%" for count in self.frames_at_level)
+        print(f"Quality switches: {self.switches}, frames per level (finest first): {shares}")
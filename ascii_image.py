@@ -1,36 +1,84 @@
 import argparse
 import sys
 import os
+import functools
 import numpy as np
 import cv2
 from PIL import Image
 from ascii_common import (
-    select_chars, pre_render_chars, load_font, parse_colors, frame_to_text,
+    select_chars, pre_render_chars, load_font, parse_colors, frame_to_text, frame_to_ansi_text,
     measure_font_metrics, process_frame, AsciiFrameOptions, add_common_arguments
 )
+from palette_cache import cached_font_metrics, cached_pre_render_chars
+from batch_common import load_image, is_batch_input, convert_batch
 
-def process_image_numpy(image_path, font, output_path, scale=1.0, bg_color="black", fg_color="white", invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, adjust_aspect_ratio=False):
+
+def image_to_text(frame, char_w, char_h, chars, invert_brightness=False, preserve_colors=False, tint_color=None, adjust_aspect_ratio=False, color_step=1):
     """
-    Fast processing using Numpy tiling.
+    Text output of process_image_numpy: plain text, or 24-bit ANSI text with preserve_colors.
+    With adjust_aspect_ratio, the frame is squashed vertically to compensate for
+    the ~1:2 terminal cell aspect. Returns (text, frame actually used).
     """
-    # Load image
-    img = Image.open(image_path)
+    h, w = frame.shape[:2]
+    if adjust_aspect_ratio:
+        new_h = max(1, int(round(h * char_h / (2 * char_w))))
+        frame = cv2.resize(frame, (w, new_h), interpolation=cv2.INTER_AREA)
+    if preserve_colors:
+        text = frame_to_ansi_text(frame, char_w, char_h, chars, invert_brightness=invert_brightness, tint_color=tint_color, color_step=color_step)
+    else:
+        text = frame_to_text(frame, char_w, char_h, chars, invert_brightness=invert_brightness)
+    return text, frame
 
-    # Convert to RGB if needed
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
 
-    # Convert to numpy array
-    frame = np.array(img)
+def render_image_file(image_path, options, output_path, scale=1.0, mode="chars", adjust_aspect_ratio=False, color_step=1):
+    """
+    Batch worker: render one image with prepared options.
+    Returns the rendered image, or text when output_path ends in .txt.
+    """
+    frame = load_image(image_path, scale)
+    if output_path.lower().endswith(".txt"):
+        text, _ = image_to_text(frame, options.char_w, options.char_h, select_chars(mode), options.invert_brightness,
+                                options.preserve_colors, options.tint_color, adjust_aspect_ratio, color_step)
+        return text
+    return process_frame(frame, options)
+
+
+def build_options(font, bg_color="black", fg_color="white", invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, use_cache=True):
+    """Measure the font and pre-render the palette. Returns AsciiFrameOptions."""
+    if use_cache:
+        char_w, char_h = cached_font_metrics(font)
+        char_palette = cached_pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
+    else:
+        char_w, char_h = measure_font_metrics(font)
+        char_palette = pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
+
+    return AsciiFrameOptions(
+        char_palette=char_palette,
+        char_w=char_w,
+        char_h=char_h,
+        invert_brightness=invert_brightness,
+        num_chars=len(select_chars(mode)),
+        preserve_colors=preserve_colors,
+        bg_color=bg_color,
+        fg_color=fg_color,
+        swap_dims=False,
+        tint_color=tint_color
+    )
 
-    # Apply scale if needed
-    if scale != 1.0:
-        h, w = frame.shape[:2]
-        new_h, new_w = int(h * scale), int(w * scale)
-        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+def process_image_numpy(image_path, font, output_path, scale=1.0, bg_color="black", fg_color="white", invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, adjust_aspect_ratio=False, use_cache=True, color_step=1):
+    """
+    Fast processing using Numpy tiling.
+    If use_cache is True, font metrics and the palette come from the on-disk cache.
+    """
+    # Load image (RGB, scaled)
+    frame = load_image(image_path, scale)
 
     # Measure font metrics
-    char_w, char_h = measure_font_metrics(font)
+    if use_cache:
+        char_w, char_h = cached_font_metrics(font)
+    else:
+        char_w, char_h = measure_font_metrics(font)
 
     h, w = frame.shape[:2]
 
@@ -45,37 +93,25 @@ def process_image_numpy(image_path, font, output_path, scale=1.0, bg_color="blac
     chars = select_chars(mode)
 
     if output_path.lower().endswith(".txt"):
+        # 24-bit ANSI colors with preserve_colors, view with `cat` or `less -R`
+        print("Rendering ANSI color text..." if preserve_colors else "Rendering text...")
+        text, frame = image_to_text(frame, char_w, char_h, chars, invert_brightness, preserve_colors, tint_color, adjust_aspect_ratio, color_step)
         if adjust_aspect_ratio:
-            new_h = max(1, int(round(h * char_h / (2 * char_w))))
-            frame = cv2.resize(frame, (w, new_h), interpolation=cv2.INTER_AREA)
-            print(f"Adjusted AR: {w}x{h} -> {w}x{new_h}")
-        print("Rendering text...")
-        text = frame_to_text(frame, char_w, char_h, chars, invert_brightness=invert_brightness)
+            print(f"Adjusted AR: {w}x{h} -> {w}x{frame.shape[0]}")
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(text)
+        if preserve_colors:
+            h, w = frame.shape[:2]
+            num_cells = max(1, (w // char_w) * (h // char_h))
+            print(f"ANSI output: {len(text.encode('utf-8')) / num_cells:.2f} bytes/cell")
         print(f"Saved to {output_path}")
         return
 
     # Pre-render fonts to a lookup table (The Palette)
-    char_palette = pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
-    num_chars = len(chars)
+    options = build_options(font, bg_color, fg_color, invert_brightness, mode, preserve_colors, tint_color, use_cache)
 
     print("Rendering image...")
     
-    # Create options object
-    options = AsciiFrameOptions(
-        char_palette=char_palette,
-        char_w=char_w,
-        char_h=char_h,
-        invert_brightness=invert_brightness,
-        num_chars=num_chars,
-        preserve_colors=preserve_colors,
-        bg_color=bg_color,
-        fg_color=fg_color,
-        swap_dims=False,
-        tint_color=tint_color
-    )
-    
     # Process frame using common function
     final_image = process_frame(frame, options)
     
@@ -86,11 +122,15 @@ def process_image_numpy(image_path, font, output_path, scale=1.0, bg_color="blac
 
 def main():
     parser = argparse.ArgumentParser(description="Fast ASCII Image Generator")
-    add_common_arguments(parser, input_help="Path to input image file", output_help="Path to output image file")
+    add_common_arguments(parser, input_help="Path to input image file, or a directory / quoted glob (e.g. 'photos/*.jpg') for batch mode", output_help="Path to output image file (batch mode: output directory, default: next to the inputs)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch mode: number of worker processes (default: CPU count)")
+    parser.add_argument("--output-ext", default=None, help="Batch mode: output file extension, e.g. png or txt (default: same as input)")
     args = parser.parse_args()
-    
+
+    batch = is_batch_input(args.input)
+
     # Set default output filename if not provided
-    if args.output is None:
+    if args.output is None and not batch:
         base, ext = os.path.splitext(args.input)
         args.output = f"{base}_ascii{ext}"
     
@@ -109,8 +149,19 @@ def main():
     
     # Font loading
     font = load_font(args.fontsize)
+
+    if batch:
+        try:
+            # The palette is built once and shared with every worker
+            options = build_options(font, bg_color, fg_color, args.invert_brightness, args.mode, args.preserve_colors, tint_color, use_cache=not args.no_cache)
+            render = functools.partial(render_image_file, scale=args.scale, mode=args.mode, adjust_aspect_ratio=args.adjust_aspect_ratio, color_step=args.color_step)
+            convert_batch(args.input, args.output, render, options, "_ascii", args.output_ext, args.workers)
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+
     try:
-        process_image_numpy(args.input, font, args.output, args.scale, bg_color, fg_color, args.invert_brightness, args.mode, args.preserve_colors, tint_color, args.adjust_aspect_ratio)
+        process_image_numpy(args.input, font, args.output, args.scale, bg_color, fg_color, args.invert_brightness, args.mode, args.preserve_colors, tint_color, args.adjust_aspect_ratio, use_cache=not args.no_cache, color_step=args.color_step)
     except Exception as e:
         print(f"Error: {e}")
 
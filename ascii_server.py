@@ -0,0 +1,465 @@
+"""
+Local HTTP/WebSocket server that renders videos and images to ASCII for browsers.
+
+Endpoints:
+    GET  /                      minimal browser client
+    GET  /stream?video=PATH     WebSocket stream of a video under --media-dir
+    POST /render                render an uploaded image (request body) once
+
+Query parameters (both endpoints): format=text|png|jpeg, fontsize, mode,
+bg_color, fg_color, invert=1, colors=1 (preserve colors in png/jpeg output).
+
+Palettes are shared by all connections (see PaletteStore). Each WebSocket
+connection has a small outgoing queue: when a client reads slower than the
+video plays, the oldest queued frame is dropped, so memory stays bounded.
+Uses only the standard library on top of the renderer's own dependencies.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import struct
+import asyncio
+import threading
+import hashlib
+import argparse
+import dataclasses
+from urllib.parse import urlsplit, parse_qs
+
+import cv2
+import numpy as np
+from PIL import ImageColor
+
+from ascii_common import process_frame, frame_to_text_indices, indices_to_text, select_chars, MODE_CHARS
+from palette_cache import PaletteStore
+from render_service import RenderService
+from video_common import VideoFileClip, prepare_clip
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+FORMATS = ["text", "png", "jpeg"]
+
+# Frames waiting to be sent per connection; older frames are dropped beyond this
+SEND_QUEUE_SIZE = 2
+# Largest accepted upload / client message
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+CLIENT_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>ASCII stream</title>
+<style>body{background:#000;color:#ddd;font-family:sans-serif}pre{font:8px/8px monospace;color:#fff}</style></head>
+<body>
+<form id="f">Video <input name="video" placeholder="path under media dir">
+<select name="format"><option>text</option><option>jpeg</option><option>png</option></select>
+Font size <input name="fontsize" value="10" size="3"> <button>Play</button> <span id="status"></span></form>
+<pre id="text"></pre><img id="image">
+<script>
+let socket = null;
+document.getElementById("f").onsubmit = (e) => {
+  e.preventDefault();
+  if (socket) socket.close();
+  const params = new URLSearchParams(new FormData(e.target));
+  socket = new WebSocket(`ws://${location.host}/stream?${params}`);
+  socket.binaryType = "blob";
+  socket.onmessage = (m) => {
+    if (typeof m.data === "string") {
+      if (m.data.startsWith("{")) { document.getElementById("status").textContent = m.data; return; }
+      document.getElementById("text").textContent = m.data;
+    } else {
+      const img = document.getElementById("image");
+      URL.revokeObjectURL(img.src);
+      img.src = URL.createObjectURL(m.data);
+    }
+  };
+};
+</script>
+</body>
+</html>
+"""
+
+
+class HttpError(Exception):
+    """Error answered with an HTTP status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclasses.dataclass
+class RenderRequest:
+    """Render settings parsed from query parameters."""
+    format: str = "text"
+    font_size: int = 10
+    mode: str = "chars"
+    bg_color: tuple = (0, 0, 0)
+    fg_color: tuple = (255, 255, 255)
+    invert_brightness: bool = False
+    preserve_colors: bool = False
+
+    @classmethod
+    def from_query(cls, query):
+        def value(name, default):
+            return query.get(name, [default])[0]
+
+        try:
+            request = cls(
+                format=value("format", "text"),
+                font_size=int(value("fontsize", 10)),
+                mode=value("mode", "chars"),
+                bg_color=ImageColor.getcolor(value("bg_color", "black"), "RGB"),
+                fg_color=ImageColor.getcolor(value("fg_color", "white"), "RGB"),
+                invert_brightness=value("invert", "0") == "1",
+                preserve_colors=value("colors", "0") == "1",
+            )
+        except ValueError as e:
+            raise HttpError(400, f"Invalid parameter: {e}")
+        if request.format not in FORMATS:
+            raise HttpError(400, f"Unknown format '{request.format}', expected one of {', '.join(FORMATS)}")
+        if request.mode not in MODE_CHARS:
+            raise HttpError(400, f"Unknown mode '{request.mode}'")
+        if not 4 <= request.font_size <= 72:
+            raise HttpError(400, "fontsize must be between 4 and 72")
+        return request
+
+    def settings(self):
+        """Palette settings as keyword arguments for PaletteStore / RenderService."""
+        return dict(font_size=self.font_size, mode=self.mode, bg_color=self.bg_color, fg_color=self.fg_color,
+                    invert_brightness=self.invert_brightness, preserve_colors=self.preserve_colors)
+
+    def options(self, palettes, swap_dims=False):
+        options = palettes.get_options(**self.settings())
+        if swap_dims:
+            options = dataclasses.replace(options, swap_dims=True)
+        return options
+
+
+def render_payload(frame, options, request):
+    """Render an RGB frame to the requested format. Returns (opcode, payload bytes)."""
+    if request.format == "text":
+        chars = select_chars(request.mode)
+        indices = frame_to_text_indices(frame, options.char_w, options.char_h, len(chars),
+                                        options.invert_brightness, options.swap_dims)
+        return OPCODE_TEXT, indices_to_text(indices, chars).encode("utf-8")
+
+    return OPCODE_BINARY, encode_image(process_frame(frame, options), request.format)
+
+
+def encode_image(rendered, image_format):
+    """Encode a rendered RGB frame as PNG or JPEG bytes."""
+    rendered = cv2.cvtColor(rendered, cv2.COLOR_RGB2BGR)
+    if image_format == "png":
+        ok, data = cv2.imencode(".png", rendered)
+    else:
+        ok, data = cv2.imencode(".jpg", rendered, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok:
+        raise ValueError(f"Could not encode {image_format}")
+    return data.tobytes()
+
+
+def websocket_frame(opcode, payload):
+    """Encode one unmasked (server to client) WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """Read one (masked) client frame. Returns (opcode, payload)."""
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("WebSocket message too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = (np.frombuffer(payload, dtype=np.uint8) ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)).tobytes()
+    return opcode, payload
+
+
+class FrameSender:
+    """
+    Per-connection outgoing frames with backpressure.
+
+    push() never blocks: when SEND_QUEUE_SIZE frames are already waiting, the
+    oldest one is discarded. run() sends frames and waits for the socket to drain,
+    so a slow client only slows its own sender.
+    """
+
+    def __init__(self, writer, queue_size=SEND_QUEUE_SIZE):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+    def push(self, opcode, payload):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.frames_dropped += 1
+        self.queue.put_nowait((opcode, payload))
+
+    async def send(self, opcode, payload):
+        data = websocket_frame(opcode, payload)
+        self.writer.write(data)
+        await self.writer.drain()
+        self.bytes_sent += len(data)
+
+    async def run(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            await self.send(*item)
+            self.frames_sent += 1
+
+    def finish(self):
+        # Let already queued frames go out, then stop
+        while self.queue.full():
+            self.queue.get_nowait()
+            self.frames_dropped += 1
+        self.queue.put_nowait(None)
+
+
+class AsciiServer:
+    """
+    Serves the browser client, video streams and one-off image renders.
+
+    Uploaded images rendered to PNG/JPEG go through a RenderService, so
+    concurrent uploads are batched and repeated ones come from its cache.
+
+    Args:
+        media_dir: directory that video paths are resolved against (paths outside it are refused)
+        palettes: PaletteStore shared by all connections
+    """
+
+    def __init__(self, media_dir=".", palettes=None):
+        self.media_dir = os.path.realpath(media_dir)
+        self.palettes = palettes or PaletteStore()
+        self.renderer = RenderService(self.palettes)
+        self.active_streams = 0
+        self._answered = set()  # Connections whose response headers were already sent
+
+    def resolve_video(self, path):
+        if not path:
+            raise HttpError(400, "Missing video parameter")
+        full_path = os.path.realpath(os.path.join(self.media_dir, path))
+        if os.path.commonpath([full_path, self.media_dir]) != self.media_dir:
+            raise HttpError(403, "Video path is outside the media directory")
+        if not os.path.isfile(full_path):
+            raise HttpError(404, f"Video not found: {path}")
+        return full_path
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, headers = await self.read_request(reader)
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            if method == "GET" and url.path == "/":
+                await self.respond(writer, 200, CLIENT_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+            elif method == "GET" and url.path == "/stream":
+                await self.stream(reader, writer, headers, query)
+            elif method == "POST" and url.path == "/render":
+                await self.render_upload(reader, writer, headers, query)
+            else:
+                raise HttpError(404, "Not found")
+        except HttpError as e:
+            await self.respond(writer, e.status, json.dumps({"error": str(e)}).encode("utf-8"), "application/json")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Error: {type(e).__name__}: {e}")
+            if writer not in self._answered:
+                try:
+                    await self.respond(writer, 500, json.dumps({"error": "Internal server error"}).encode("utf-8"), "application/json")
+                except ConnectionError:
+                    pass
+        finally:
+            self._answered.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "Request header too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method, target, headers
+
+    async def respond(self, writer, status, body, content_type):
+        reasons = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 413: "Payload Too Large",
+                   431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+        head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        self._answered.add(writer)
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def render_upload(self, reader, writer, headers, query):
+        request = RenderRequest.from_query(query)
+        length = int(headers.get("content-length", 0))
+        if length <= 0:
+            raise HttpError(400, "Missing image body")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Image too large")
+        body = await reader.readexactly(length)
+
+        def decode():
+            image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise HttpError(400, "Could not decode image")
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        frame = await asyncio.to_thread(decode)
+        if request.format == "text":
+            _, payload = await asyncio.to_thread(render_payload, frame, request.options(self.palettes), request)
+        else:
+            # submit hashes the image and may build a palette, so keep it off the event loop
+            future = await asyncio.to_thread(self.renderer.submit, frame, **request.settings())
+            rendered = await asyncio.wrap_future(future)
+            payload = await asyncio.to_thread(encode_image, rendered, request.format)
+        content_type = {"text": "text/plain; charset=utf-8", "png": "image/png", "jpeg": "image/jpeg"}[request.format]
+        await self.respond(writer, 200, payload, content_type)
+
+    async def stream(self, reader, writer, headers, query):
+        if headers.get("upgrade", "").lower() != "websocket" or "sec-websocket-key" not in headers:
+            raise HttpError(400, "Expected a WebSocket upgrade")
+        request = RenderRequest.from_query(query)
+        video_path = self.resolve_video(query.get("video", [""])[0])
+
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+        self._answered.add(writer)
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        sender = FrameSender(writer)
+        send_task = asyncio.create_task(sender.run())
+        receive_task = asyncio.create_task(self.receive(reader, sender))
+        produce_task = asyncio.create_task(self.produce(video_path, request, sender))
+        self.active_streams += 1
+        try:
+            done, _ = await asyncio.wait([produce_task, receive_task, send_task], return_when=asyncio.FIRST_COMPLETED)
+            if produce_task in done:
+                error = produce_task.exception()
+                if error is not None:
+                    sender.push(OPCODE_TEXT, json.dumps({"error": str(error)}).encode("utf-8"))
+                sender.finish()
+                await send_task
+                await sender.send(OPCODE_CLOSE, struct.pack("!H", 1000))
+        except ConnectionError:
+            pass
+        finally:
+            self.active_streams -= 1
+            tasks = (produce_task, receive_task, send_task)
+            for task in tasks:
+                task.cancel()
+            # Wait for the tasks to unwind (produce closes its clip) and retrieve their exceptions
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print(f"Stream {os.path.basename(video_path)}: sent {sender.frames_sent}, dropped {sender.frames_dropped} frames")
+
+    async def receive(self, reader, sender):
+        """Answer pings and return when the client closes the connection."""
+        while True:
+            opcode, payload = await read_websocket_frame(reader)
+            if opcode == OPCODE_CLOSE:
+                return
+            if opcode == OPCODE_PING:
+                await sender.send(OPCODE_PONG, payload)
+
+    async def produce(self, video_path, request, sender):
+        """Decode and render the video at its frame rate, pushing frames to the sender."""
+        clip = await asyncio.to_thread(VideoFileClip, video_path, audio=False)
+        # A cancelled to_thread call keeps running, so the clip is only read and
+        # closed under this lock, in worker threads
+        clip_lock = threading.Lock()
+        closed = False
+
+        def close_clip():
+            nonlocal closed
+            with clip_lock:
+                closed = True
+                clip.close()
+
+        try:
+            clip, _, _, swap_dims = await asyncio.to_thread(prepare_clip, clip, 1.0, video_path)
+            options = await asyncio.to_thread(request.options, self.palettes, swap_dims)
+            frames = clip.iter_frames()
+            frame_time = 1.0 / clip.fps
+            start = time.perf_counter()
+            index = 0
+
+            def next_payload():
+                with clip_lock:
+                    frame = None if closed else next(frames, None)
+                return None if frame is None else render_payload(frame, options, request)
+
+            while True:
+                item = await asyncio.to_thread(next_payload)
+                if item is None:
+                    return
+                sender.push(*item)
+                index += 1
+                delay = start + index * frame_time - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        finally:
+            await asyncio.to_thread(close_clip)
+
+
+async def serve(host, port, media_dir, font_path=None):
+    app = AsciiServer(media_dir, PaletteStore(font_path))
+    server = await asyncio.start_server(app.handle, host, port, limit=64 * 1024)
+    print(f"Serving {app.media_dir} on http://{host}:{port}/")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASCII video/image server (HTTP + WebSocket)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--media-dir", default=".", help="Directory that video paths are resolved against (default: current directory)")
+    parser.add_argument("--font", default=None, help="Path to a font file (default: Menlo, falling back to Pillow's default)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.media_dir, args.font))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,214 @@
 import argparse
 import sys
-import subprocess
-import json
 import os
+import time
+from dataclasses import replace
 import numpy as np
+import cv2
 from tqdm import tqdm
 
-# --- MOVIEPY IMPORT HANDLER (Handles v1.0 and v2.0) ---
-try:
-    from moviepy.editor import VideoFileClip, ImageSequenceClip
-except ImportError:
-    from moviepy.video.io.VideoFileClip import VideoFileClip
-    from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
-
 from ascii_common import (
     select_chars, pre_render_chars, load_font, parse_colors,
-    measure_font_metrics, process_frame, AsciiFrameOptions, add_common_arguments
+    frame_to_text_indices, frame_to_color_cells, measure_font_metrics, process_frame, process_frames, AsciiFrameOptions, DeltaFrameRenderer, add_common_arguments
+)
+from palette_cache import cached_font_metrics, cached_pre_render_chars
+from terminal_common import TerminalPlayer, TerminalSink, DiffTerminalSink, DIFF_COLOR_STEP, fit_cell_size
+from video_common import (
+    VideoFileClip, ImageSequenceClip, prepare_clip,
+    StreamingVideoWriter, FramePipeline, render_frames_parallel, render_frames_batched
 )
+from text_archive import TextArchiveWriter, ARCHIVE_EXTENSION
+from live_common import open_capture, parse_size, run_live
+from adaptive_quality import AdaptiveQuality, quality_scales, scaled_cell_sizes
+from segment_common import render_video_segmented
+from profile_common import StageProfiler, TraceRecorder, profiled_frames, traced_frames, stage
 
-def get_video_rotation(video_path):
+def make_cell_renderer(cell_sizes, chars, invert_brightness=False, swap_dims=False, preserve_colors=False, tint_color=None, color_step=1, controller=None):
     """
-    Get rotation metadata from video file using ffprobe.
-    Returns rotation angle in degrees (0, 90, 180, 270) or 0 if not found.
+    Return render_cells(frame) -> (indices, colors) for terminal output.
+    cell_sizes holds the (cell_w, cell_h) of each quality level; with an
+    AdaptiveQuality controller the level follows the measured render times.
     """
-    try:
-        cmd = [
-            'ffprobe', '-v', 'quiet', '-print_format', 'json',
-            '-show_streams', '-select_streams', 'v:0', video_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
-        
-        if 'streams' in data and len(data['streams']) > 0:
-            stream = data['streams'][0]
-            # Check for rotation in tags or side_data_list
-            rotation = 0
-            if 'tags' in stream and 'rotate' in stream['tags']:
-                rotation = int(stream['tags']['rotate'])
-            elif 'side_data_list' in stream:
-                for side_data in stream['side_data_list']:
-                    if side_data.get('rotation'):
-                        rotation = side_data['rotation']
-                        break
-            
-            # Normalize rotation to 0, 90, 180, 270
-            rotation = rotation % 360
-            if rotation not in [0, 90, 180, 270]:
-                rotation = 0
-            return rotation
-    except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError, ValueError):
-        pass
-    
-    return 0
+    def render_cells(frame):
+        start = time.perf_counter()
+        cell_w, cell_h = cell_sizes[controller.level if controller else 0]
+        if preserve_colors:
+            cells = frame_to_color_cells(frame, cell_w, cell_h, len(chars), invert_brightness, swap_dims, tint_color, color_step)
+        else:
+            cells = frame_to_text_indices(frame, cell_w, cell_h, len(chars), invert_brightness, swap_dims), None
+        if controller:
+            controller.record(time.perf_counter() - start)
+        return cells
+    return render_cells
 
 
-def process_video_numpy(clip, font, output_path, scale=1.0, video_path=None, bg_color="black", fg_color="white", invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None):
+def play_video(clip, scale=1.0, video_path=None, invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, color_step=1, diff_redraw=False, quality_levels=1, target_fps=None):
     """
-    Fast processing using Numpy tiling.
+    Play a video as ASCII text in the terminal at the source frame rate.
+    The grid is sized to fit the terminal; frames are dropped when rendering falls behind.
+    With preserve_colors, frames are drawn with 24-bit ANSI colors.
+    With diff_redraw, only cells that changed since the previous frame are sent;
+    colors are then quantized to at least DIFF_COLOR_STEP.
+    With quality_levels > 1, the grid coarsens (and recovers) to hold target_fps
+    (default: the video frame rate).
     """
-    # Measure font metrics
-    char_w, char_h = measure_font_metrics(font)
+    clip, w, h, swap_dims = prepare_clip(clip, scale, video_path)
+    cell_w, cell_h = fit_cell_size(w, h)
+    chars = select_chars(mode)
+
+    print(f"Resolution: {w}x{h}")
+    print(f"Grid: {w // cell_w}x{h // cell_h}")
+
+    cell_sizes = scaled_cell_sizes(cell_w, cell_h, quality_levels)
+    controller = AdaptiveQuality(quality_levels, target_fps or clip.fps) if quality_levels > 1 else None
+    render_cells = make_cell_renderer(cell_sizes, chars, invert_brightness, swap_dims, preserve_colors, tint_color, color_step, controller)
+
+    sink = DiffTerminalSink(chars, color_step=max(color_step, DIFF_COLOR_STEP)) if diff_redraw else TerminalSink(chars)
+    player = TerminalPlayer(clip.fps, sink)
+    player.cells_per_frame = (w // cell_w) * (h // cell_h)
+    player.play(clip.iter_frames(), render_cells)
+    player.print_report()
+    if controller:
+        controller.print_report()
+
+
+def live_video(source, font_size=None, capture_size=None, invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, color_step=1, diff_redraw=False, bg_color="black", fg_color="white", latency_budget=0.1, max_frames=None, duration=None, quality_levels=1, target_fps=None):
+    """
+    Render a live source ('test', a device index or a device path) in real time.
+    Without a font size, frames are drawn as text in the terminal (frame_to_text cells);
+    with one, they are rendered with process_frame and shown in a window (q or Esc quits).
+    Frames older than latency_budget seconds are dropped; latency percentiles are reported.
+    With quality_levels > 1, coarser grids (larger cells or fonts, all built up front)
+    are used while rendering cannot keep up with target_fps (default: the source rate).
+    """
+    capture = open_capture(source, capture_size)
+    w = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    print(f"Source: {source} ({w}x{h} at {source_fps:.1f} fps)")
+    chars = select_chars(mode)
+    controller = AdaptiveQuality(quality_levels, target_fps or source_fps) if quality_levels > 1 else None
+
+    if font_size is None:
+        cell_w, cell_h = fit_cell_size(w, h)
+        print(f"Grid: {w // cell_w}x{h // cell_h}")
+        render_cells = make_cell_renderer(scaled_cell_sizes(cell_w, cell_h, quality_levels), chars, invert_brightness, False, preserve_colors, tint_color, color_step, controller)
+        sink = DiffTerminalSink(chars, color_step=max(color_step, DIFF_COLOR_STEP)) if diff_redraw else TerminalSink(chars)
+
+        def show_frame(frame):
+            sink.draw(*render_cells(frame))
 
-    # Resize Logic (MoviePy 1 vs 2 compatibility)
-    if scale != 1.0:
+        sink.begin()
         try:
-            clip = clip.resize(scale)
-        except AttributeError:
-            clip = clip.resized(scale)
+            stats, reader = run_live(capture, show_frame, latency_budget, max_frames, duration)
+        finally:
+            sink.finish()
+    else:
+        # One palette per quality level, built before the first frame
+        levels = []
+        for scale in quality_scales(quality_levels):
+            font = load_font(round(font_size * scale))
+            char_w, char_h = cached_font_metrics(font)
+            levels.append(AsciiFrameOptions(
+                char_palette=cached_pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode),
+                char_w=char_w,
+                char_h=char_h,
+                invert_brightness=invert_brightness,
+                num_chars=len(chars),
+                preserve_colors=preserve_colors,
+                bg_color=bg_color,
+                fg_color=fg_color,
+                tint_color=tint_color
+            ))
+        print(f"Grid: {w // levels[0].char_w}x{h // levels[0].char_h}")
 
-    w, h = clip.size
-    
-    # Account for video rotation metadata (swap dimensions if rotated 90/270 degrees)
-    rotation = 0
-    swap_dims = False
-    if video_path:
-        rotation = get_video_rotation(video_path)
-        print(f"Video rotation: {rotation}°")
-        if rotation in [90, 270]:
-            print(f"Swapping dimensions for rotation: {w}x{h} -> {h}x{w}")
-            w, h = h, w
-            swap_dims = True
+        def show_frame(frame):
+            start = time.perf_counter()
+            rendered = process_frame(frame, levels[controller.level if controller else 0])
+            if controller:
+                controller.record(time.perf_counter() - start)
+            cv2.imshow("ascii_video", cv2.cvtColor(rendered, cv2.COLOR_RGB2BGR))
+            return cv2.waitKey(1) & 0xFF not in (ord("q"), 27)
+
+        try:
+            stats, reader = run_live(capture, show_frame, latency_budget, max_frames, duration)
+        finally:
+            cv2.destroyAllWindows()
+
+    stats.print_report(reader)
+    if controller:
+        controller.print_report()
+
+
+def export_text_archive(clip, font, output_path, scale=1.0, video_path=None, invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, color_step=1, use_cache=True):
+    """
+    Export the video as a text archive (.ascv) of character grids instead of pixels.
+    The grid matches the rendered video for the same font size; with preserve_colors
+    the cell colors are stored too. Play it back with text_archive.py.
+    """
+    if use_cache:
+        char_w, char_h = cached_font_metrics(font)
+    else:
+        char_w, char_h = measure_font_metrics(font)
+
+    clip, w, h, swap_dims = prepare_clip(clip, scale, video_path)
+    cols = w // char_w
+    rows = h // char_h
+    chars = select_chars(mode)
+
+    print(f"Resolution: {w}x{h}")
+    print(f"Grid: {cols}x{rows}")
+
+    total_frames = int(clip.fps * clip.duration)
+    print("Rendering frames...")
+    with TextArchiveWriter(output_path, rows, cols, clip.fps, chars, colors=preserve_colors) as writer:
+        for frame in tqdm(clip.iter_frames(), total=total_frames):
+            if preserve_colors:
+                indices, colors = frame_to_color_cells(frame, char_w, char_h, len(chars), invert_brightness, swap_dims, tint_color, color_step)
+            else:
+                indices, colors = frame_to_text_indices(frame, char_w, char_h, len(chars), invert_brightness, swap_dims), None
+            writer.write_frame(indices, colors)
+
+    size = os.path.getsize(output_path)
+    print(f"Archive: {writer.frame_count} frames, {size / 1024:.1f} KiB ({writer.raw_bytes / max(size, 1):.1f}x smaller than raw grids)")
+    print(f"Saved to {output_path}")
+
+
+def process_video_numpy(clip, font, output_path, scale=1.0, video_path=None, bg_color="black", fg_color="white", invert_brightness=False, mode="chars", preserve_colors=False, tint_color=None, stream=False, workers=1, pipeline=False, queue_size=8, grid_decode=False, delta=False, batch_size=1, use_cache=True, profile=None, trace=None, segmented=False, segments=None, work_dir=None):
+    """
+    Fast processing using Numpy tiling.
+    If stream is True, each frame is encoded as soon as it is rendered instead of
+    being collected in memory first.
+    If workers > 1, frames are rendered in parallel on a process pool.
+    If pipeline is True, decoding, rendering and encoding run concurrently,
+    connected by queues of queue_size frames (implies streaming).
+    If grid_decode is True, ffmpeg scales frames down to the character grid while
+    decoding, so full-resolution frames are never transferred or converted. It
+    samples the nearest pixel (grayscale) or averages each cell (preserve_colors)
+    like the default path, but on its own pixel grid and in YUV, so the output is
+    close to, not identical with, the default path (roughly 85% of characters match).
+    If delta is True, only cells whose character changed since the previous frame
+    are re-stamped (grayscale mode only, single process).
+    If batch_size > 1, frames are rendered batch_size at a time with process_frames.
+    If use_cache is True, font metrics and the palette come from the on-disk cache.
+    If profile is a path, frames are rendered and encoded one at a time with
+    per-stage timing and memory tracing, and a JSON summary is written there.
+    If trace is a path, decode, render (with its stages) and encode spans for
+    every frame, per thread and worker process, and queue depth counters are
+    written there as a Chrome trace-event file (chrome://tracing, Perfetto).
+    If segmented is True, the video is split into segments (default: two per
+    worker) starting on keyframes; each worker decodes, renders and encodes its
+    own segments and the results are joined with ffmpeg's concat demuxer.
+    Finished segments are kept in work_dir (default: {output base}_segments)
+    until the join, so an interrupted run resumes where it stopped.
+    """
+    # Measure font metrics
+    if use_cache:
+        char_w, char_h = cached_font_metrics(font)
+    else:
+        char_w, char_h = measure_font_metrics(font)
+
+    clip, w, h, swap_dims = prepare_clip(clip, scale, video_path)
     
     # Calculate grid dimensions
     cols = w // char_w
@@ -90,11 +219,12 @@ def process_video_numpy(clip, font, output_path, scale=1.0, video_path=None, bg_
     print(f"Char Size: {char_w}x{char_h}")
     
     # Pre-render fonts to a lookup table (The Palette)
-    char_palette = pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
+    if use_cache:
+        char_palette = cached_pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
+    else:
+        char_palette = pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
     num_chars = len(select_chars(mode))
 
-    processed_frames = []
-    
     # Create options object
     options = AsciiFrameOptions(
         char_palette=char_palette,
@@ -106,17 +236,145 @@ def process_video_numpy(clip, font, output_path, scale=1.0, video_path=None, bg_
         bg_color=bg_color,
         fg_color=fg_color,
         swap_dims=swap_dims,
-        tint_color=tint_color
+        tint_color=tint_color,
+        prescaled=grid_decode
     )
     
+    if segmented:
+        if video_path is None:
+            raise ValueError("segmented rendering requires video_path")
+        if grid_decode or delta or pipeline or batch_size > 1 or profile or trace:
+            print("Segmented rendering ignores --grid-decode, --delta, --pipeline, --batch-size, --profile and --trace")
+        print(f"Resulting video resolution: {cols * char_w}x{rows * char_h}")
+        print("Rendering and encoding segments...")
+        # Segment workers decode full-resolution frames themselves
+        segment_options = replace(options, prescaled=False)
+        render_video_segmented(video_path, output_path, process_frame, segment_options, clip.fps, clip.duration, scale, workers, segments, work_dir)
+        print(f"Saved to {output_path}")
+        return
+
+    total_frames = int(clip.fps * clip.duration)
+
+    if grid_decode:
+        if video_path is None:
+            raise ValueError("grid_decode requires video_path")
+        # Match the default path's sampling: nearest pixel for characters, cell
+        # averages (INTER_AREA) for preserved colors
+        resize_algorithm = "area" if preserve_colors else "neighbor"
+        print(f"Decoding at grid resolution: {cols}x{rows} ({resize_algorithm})")
+        decode_clip = VideoFileClip(video_path, audio=False, target_resolution=(rows, cols), resize_algorithm=resize_algorithm)
+    else:
+        decode_clip = clip
+
+    if delta:
+        if workers > 1:
+            raise ValueError("Delta rendering needs consecutive frames and cannot be combined with workers")
+        delta_renderer = DeltaFrameRenderer(options)
+
+    if profile and trace:
+        raise ValueError("profile and trace cannot be combined")
+    tracer = TraceRecorder(process_name="ascii_video") if trace else None
+
+    def render_frame(frame):
+        with stage(tracer, "render"):
+            return process_frame(frame, options, tracer)
+
+    def render_delta(frame):
+        with stage(tracer, "render"):
+            return delta_renderer.render(frame)
+
+    # We use a generator to process frames
+    def render_frames(frames):
+        if workers > 1:
+            return render_frames_parallel(frames, process_frame, options, workers, tracer=tracer)
+        if delta:
+            # The delta renderer reuses its output buffer; only the plain streaming
+            # writer consumes each frame before the next one is rendered
+            if stream and not pipeline:
+                return (render_delta(frame) for frame in frames)
+            return (render_delta(frame).copy() for frame in frames)
+        if batch_size > 1:
+            return render_frames_batched(frames, process_frames, options, batch_size)
+        return (render_frame(frame) for frame in frames)
+
+    def decoded_frames():
+        if tracer is None:
+            return decode_clip.iter_frames()
+        return traced_frames(decode_clip.iter_frames(), tracer)
+
+    def save_trace():
+        tracer.write(trace)
+        print(f"Trace saved to {trace} ({len(tracer.events)} events)")
+
+    if profile:
+        if workers > 1 or pipeline or delta or batch_size > 1:
+            print("Profiling renders frames serially; --workers, --pipeline, --delta and --batch-size are ignored")
+        print(f"Resulting video resolution: {cols * char_w}x{rows * char_h}")
+        print("Rendering and encoding frames (profiled)...")
+        profiler = StageProfiler()
+        profiler.start()
+        with StreamingVideoWriter(output_path, clip.fps, audio=clip.audio) as writer:
+            for frame in tqdm(profiled_frames(decode_clip.iter_frames(), profiler), total=total_frames):
+                final_frame = process_frame(frame, options, profiler)
+                with profiler.stage("encode"):
+                    writer.write_frame(final_frame)
+                profiler.end_frame()
+        profiler.stop()
+        profiler.print_report()
+        profiler.write_json(profile, video=video_path, grid=[cols, rows], char_size=[char_w, char_h],
+                            mode=mode, preserve_colors=preserve_colors, grid_decode=grid_decode)
+        print(f"Profile saved to {profile}")
+        print(f"Saved to {output_path}")
+        return
+
+    if workers > 1:
+        print(f"Workers: {workers}")
+
+    if pipeline:
+        print(f"Resulting video resolution: {cols * char_w}x{rows * char_h}")
+        print("Rendering and encoding frames (pipelined)...")
+        with StreamingVideoWriter(output_path, clip.fps, audio=clip.audio) as writer:
+            frame_pipeline = FramePipeline(decode_clip.iter_frames(), render_frames, writer.write_frame, queue_size, tracer)
+            with tqdm(total=total_frames) as progress:
+                frame_pipeline.run(progress)
+        frame_pipeline.print_report()
+        if tracer:
+            save_trace()
+        if delta:
+            print(f"Cells re-stamped: {delta_renderer.changed_ratio():.1%}")
+        print(f"Saved to {output_path}")
+        return
+
+    if tracer:
+        tracer.name_thread("main")
+    rendered_frames = render_frames(decoded_frames())
+
+    if stream:
+        print(f"Resulting video resolution: {cols * char_w}x{rows * char_h}")
+        print("Rendering and encoding frames...")
+        with StreamingVideoWriter(output_path, clip.fps, audio=clip.audio) as writer:
+            for index, final_frame in enumerate(tqdm(rendered_frames, total=total_frames)):
+                if tracer:
+                    tracer.set_frame(index)
+                with stage(tracer, "encode"):
+                    writer.write_frame(final_frame)
+        if delta:
+            print(f"Cells re-stamped: {delta_renderer.changed_ratio():.1%}")
+        if tracer:
+            save_trace()
+        print(f"Saved to {output_path}")
+        return
+
+    processed_frames = []
+
     print("Rendering frames...")
     
-    # We use a generator to process frames
-    for frame in tqdm(clip.iter_frames(), total=int(clip.fps * clip.duration)):
-        # Process frame using common function
-        final_frame = process_frame(frame, options)
+    for final_frame in tqdm(rendered_frames, total=total_frames):
         processed_frames.append(final_frame)
 
+    if delta:
+        print(f"Cells re-stamped: {delta_renderer.changed_ratio():.1%}")
+
     print("Encoding video...")
     final_clip = ImageSequenceClip(processed_frames, fps=clip.fps)
     
@@ -126,11 +384,37 @@ def process_video_numpy(clip, font, output_path, scale=1.0, video_path=None, bg_
     final_w, final_h = final_clip.size
     print(f"Resulting video resolution: {final_w}x{final_h}")
         
-    final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
+    if tracer:
+        tracer.set_frame(None)
+    with stage(tracer, "encode"):
+        final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
+    if tracer:
+        save_trace()
 
 def main():
     parser = argparse.ArgumentParser(description="Fast ASCII Video Generator")
     add_common_arguments(parser, input_help="Path to input video file", output_help="Path to output video file")
+    parser.add_argument("--stream", action="store_true", help="Encode each frame as soon as it is rendered (constant memory for long videos)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes used to render frames (default: 1; with --segmented, the CPU count)")
+    parser.add_argument("--segmented", action="store_true", help="Split the video at keyframes; each worker decodes, renders and encodes whole segments, which are joined without re-encoding")
+    parser.add_argument("--segments", type=int, default=None, help="With --segmented, number of segments (default: 2 per worker)")
+    parser.add_argument("--work-dir", default=None, help="With --segmented, directory for finished segments and the resume manifest (default: {output}_segments)")
+    parser.add_argument("--pipeline", action="store_true", help="Overlap decoding, rendering and encoding in separate stages (implies --stream)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Frames buffered between pipeline stages (default: 8)")
+    parser.add_argument("--delta", action="store_true", help="Only re-stamp characters that changed since the previous frame (grayscale mode)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Render this many frames per vectorised call (helps small grids)")
+    parser.add_argument("--grid-decode", action="store_true", help="Have ffmpeg decode frames directly at character-grid resolution (much less decode and memory traffic; output is close to, not identical with, the default path)")
+    parser.add_argument("--play", action="store_true", help="Play the video as text in the terminal instead of writing a file")
+    parser.add_argument("--live", action="store_true", help="Treat input as a live source: 'test' (synthetic pattern), a device index such as 0, or a device path such as /dev/video0")
+    parser.add_argument("--window", action="store_true", help="With --live, render with the font and show frames in a window instead of the terminal")
+    parser.add_argument("--capture-size", default=None, help="With --live, requested capture size as WIDTHxHEIGHT (default: device default, 640x480 for test)")
+    parser.add_argument("--latency-budget", type=float, default=100, help="With --live, drop frames older than this many milliseconds (default: 100)")
+    parser.add_argument("--duration", type=float, default=None, help="With --live, stop after this many seconds")
+    parser.add_argument("--quality-levels", type=int, default=1, help="With --play or --live, number of grid sizes to switch between to hold the target fps (default: 1 = fixed grid)")
+    parser.add_argument("--target-fps", type=float, default=None, help="With --quality-levels, frame rate to hold (default: source frame rate)")
+    parser.add_argument("--profile", nargs="?", const="", default=None, help="Time decode, resize, indices, gather and encode per frame, trace peak memory, and write a JSON summary (default path: {output}_profile.json)")
+    parser.add_argument("--trace", nargs="?", const="", default=None, help="Write decode/render/encode spans per frame, thread and worker plus queue depths as a Chrome trace-event JSON file for chrome://tracing or Perfetto (default path: {output}_trace.json)")
+    parser.add_argument("--diff-redraw", action="store_true", help="With --play or --live, only send cells that changed since the previous frame (for slow links such as SSH)")
     args = parser.parse_args()
     
     # Set default output filename if not provided
@@ -138,6 +422,13 @@ def main():
         base, ext = os.path.splitext(args.input)
         args.output = f"{base}_ascii{ext}"
     
+    if args.profile == "":
+        args.profile = f"{os.path.splitext(args.output)[0]}_profile.json"
+    if args.trace == "":
+        args.trace = f"{os.path.splitext(args.output)[0]}_trace.json"
+    if args.workers is None:
+        args.workers = (os.cpu_count() or 1) if args.segmented else 1
+
     # Parse colors
     bg_color, fg_color = parse_colors(args.bg_color, args.fg_color)
     
@@ -151,11 +442,31 @@ def main():
             print(f"Error: Invalid tint color format. {e}")
             sys.exit(1)
     
+    if args.live:
+        try:
+            capture_size = parse_size(args.capture_size) if args.capture_size else None
+            font_size = args.fontsize if args.window else None
+            live_video(args.input, font_size, capture_size, invert_brightness=args.invert_brightness, mode=args.mode, preserve_colors=args.preserve_colors, tint_color=tint_color, color_step=args.color_step, diff_redraw=args.diff_redraw, bg_color=bg_color, fg_color=fg_color, latency_budget=args.latency_budget / 1000, duration=args.duration, quality_levels=args.quality_levels, target_fps=args.target_fps)
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+
+    if args.play:
+        try:
+            clip = VideoFileClip(args.input)
+            play_video(clip, args.scale, video_path=args.input, invert_brightness=args.invert_brightness, mode=args.mode, preserve_colors=args.preserve_colors, tint_color=tint_color, color_step=args.color_step, diff_redraw=args.diff_redraw, quality_levels=args.quality_levels, target_fps=args.target_fps)
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+    
     # Font loading
     font = load_font(args.fontsize)
     try:
         clip = VideoFileClip(args.input)
-        process_video_numpy(clip, font, args.output, args.scale, video_path=args.input, bg_color=bg_color, fg_color=fg_color, invert_brightness=args.invert_brightness, mode=args.mode, preserve_colors=args.preserve_colors, tint_color=tint_color)
+        if args.output.lower().endswith(ARCHIVE_EXTENSION):
+            export_text_archive(clip, font, args.output, args.scale, video_path=args.input, invert_brightness=args.invert_brightness, mode=args.mode, preserve_colors=args.preserve_colors, tint_color=tint_color, color_step=args.color_step, use_cache=not args.no_cache)
+            return
+        process_video_numpy(clip, font, args.output, args.scale, video_path=args.input, bg_color=bg_color, fg_color=fg_color, invert_brightness=args.invert_brightness, mode=args.mode, preserve_colors=args.preserve_colors, tint_color=tint_color, stream=args.stream, workers=args.workers, pipeline=args.pipeline, queue_size=args.queue_size, grid_decode=args.grid_decode, delta=args.delta, batch_size=args.batch_size, use_cache=not args.no_cache, profile=args.profile, trace=args.trace, segmented=args.segmented, segments=args.segments, work_dir=args.work_dir)
     except Exception as e:
         print(f"Error: {e}")
 
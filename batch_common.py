@@ -0,0 +1,207 @@
+"""
+Batch conversion of many images (a directory or a glob) shared by the ASCII and
+emoji image generators.
+
+The palette is built once in the parent and sent to each worker process when it
+starts. Workers load and render images; the parent hands results to writer
+threads, so PNG encoding overlaps rendering. A failing file is reported and
+skipped without stopping the batch.
+"""
+import os
+import glob
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp"}
+
+
+def load_image(image_path, scale=1.0):
+    """Load an image as an RGB numpy array, optionally scaled."""
+    img = Image.open(image_path)
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    frame = np.array(img)
+
+    if scale != 1.0:
+        h, w = frame.shape[:2]
+        new_h, new_w = int(h * scale), int(w * scale)
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return frame
+
+
+def is_batch_input(input_path):
+    """True if input_path is a directory or a glob pattern rather than a single file."""
+    return os.path.isdir(input_path) or glob.has_magic(input_path)
+
+
+def expand_inputs(input_path):
+    """List the image files of a directory or glob pattern, sorted."""
+    if os.path.isdir(input_path):
+        paths = [os.path.join(input_path, name) for name in os.listdir(input_path)]
+    else:
+        paths = glob.glob(input_path)
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def batch_jobs(input_paths, output_dir=None, suffix="_ascii", output_ext=None):
+    """
+    Pair each input with its output path: {name}{suffix}{ext} in output_dir
+    (default: next to the input). ext defaults to the input extension.
+    Outputs of earlier runs (names already ending in suffix) are skipped.
+    Raises ValueError if two inputs would be written to the same output path
+    (same name in different directories, or a.png and a.jpg with output_ext).
+    """
+    jobs = []
+    for path in input_paths:
+        base, ext = os.path.splitext(os.path.basename(path))
+        if base.endswith(suffix):
+            continue
+        ext = output_ext or ext
+        if not ext.startswith("."):
+            ext = "." + ext
+        directory = output_dir if output_dir is not None else os.path.dirname(path)
+        jobs.append((path, os.path.join(directory, f"{base}{suffix}{ext}")))
+
+    inputs_by_output = {}
+    for path, output_path in jobs:
+        inputs_by_output.setdefault(os.path.normcase(os.path.abspath(output_path)), []).append(path)
+    conflicts = [paths for paths in inputs_by_output.values() if len(paths) > 1]
+    if conflicts:
+        listed = "; ".join(", ".join(paths) for paths in conflicts)
+        raise ValueError(f"Several inputs map to the same output file: {listed}")
+    return jobs
+
+
+# Per-process state for batch workers, set once by _init_batch_worker
+_batch_render = None
+_batch_options = None
+
+
+def _init_batch_worker(render_image, options):
+    global _batch_render, _batch_options
+    _batch_render = render_image
+    _batch_options = options
+
+
+def _render_batch_item(image_path, output_path):
+    # Catch everything so one bad file cannot take down the pool
+    try:
+        return _batch_render(image_path, _batch_options, output_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def save_output(result, output_path):
+    """Write a rendered image (numpy array) or text (str) to output_path."""
+    if isinstance(result, str):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(result)
+    else:
+        Image.fromarray(result.astype(np.uint8)).save(output_path)
+
+
+def run_batch(jobs, render_image, options, workers=1, writer_threads=None, max_in_flight=None, progress=None):
+    """
+    Render (input, output) jobs with render_image(image_path, options, output_path),
+    which returns an image array or text, and save the results.
+
+    With workers > 1, images are rendered on a process pool; options are pickled
+    once per worker. At most max_in_flight images (default 2 * workers +
+    writer_threads) are rendering or waiting to be written, which bounds memory.
+    PNG encoding is usually as expensive as rendering, so writer_threads defaults
+    to the number of workers (at least 2).
+
+    Returns (converted, failures) where failures is a list of (input path, error).
+    """
+    if writer_threads is None:
+        writer_threads = max(2, workers)
+    if max_in_flight is None:
+        max_in_flight = 2 * max(workers, 1) + writer_threads
+    failures = []
+    converted = 0
+
+    for output_dir in {os.path.dirname(output_path) for _, output_path in jobs}:
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(render_image, options))
+    else:
+        _init_batch_worker(render_image, options)
+        pool = None
+
+    writers = ThreadPoolExecutor(max_workers=writer_threads)
+    in_flight = deque()
+
+    def finish_oldest():
+        # Results are handled in submission order: render, then hand to a writer
+        nonlocal converted
+        image_path, output_path, stage, future = in_flight.popleft()
+        if stage == "render":
+            result, error = future.result() if pool else future
+            if error is not None:
+                failures.append((image_path, error))
+                if progress:
+                    progress.update(1)
+                return
+            in_flight.append((image_path, output_path, "write", writers.submit(save_output, result, output_path)))
+            return
+        try:
+            future.result()
+            converted += 1
+        except Exception as e:
+            failures.append((image_path, f"{type(e).__name__}: {e}"))
+        if progress:
+            progress.update(1)
+
+    try:
+        for image_path, output_path in jobs:
+            while len(in_flight) >= max_in_flight:
+                finish_oldest()
+            if pool:
+                future = pool.submit(_render_batch_item, image_path, output_path)
+            else:
+                future = _render_batch_item(image_path, output_path)
+            in_flight.append((image_path, output_path, "render", future))
+        while in_flight:
+            finish_oldest()
+    finally:
+        writers.shutdown(wait=True)
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    return converted, failures
+
+
+def convert_batch(input_path, output_dir, render_image, options, suffix, output_ext=None, workers=None):
+    """
+    Convert every image matching input_path (directory or glob) and print a
+    summary with images/sec, wall time and failed files.
+    """
+    jobs = batch_jobs(expand_inputs(input_path), output_dir, suffix, output_ext)
+    if not jobs:
+        print(f"No images found for {input_path}")
+        return
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    print(f"Converting {len(jobs)} images with {workers} worker{'s' if workers > 1 else ''}...")
+
+    start = time.perf_counter()
+    with tqdm(total=len(jobs)) as progress:
+        converted, failures = run_batch(jobs, render_image, options, workers, progress=progress)
+    elapsed = time.perf_counter() - start
+
+    print(f"Converted {converted} images in {elapsed:.2f}s ({converted / elapsed if elapsed > 0 else 0.0:.1f} images/sec)")
+    if failures:
+        print(f"Failed: {len(failures)}")
+        for image_path, error in failures:
+            print(f"  {image_path}: {error}")
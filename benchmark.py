@@ -0,0 +1,309 @@
+"""
+Benchmarks for the render kernels (ascii_common.process_frame and
+emoji_common.process_frame) on synthetic frames.
+
+Sweeps character modes, preserve_colors, font sizes, emoji sets, match modes and
+input resolutions, and reports ms/frame, cells/sec and peak memory per case.
+Results are written as JSON and can be compared against a stored baseline:
+
+    python benchmark.py -o baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.1
+
+Palettes are synthetic (random glyphs of the size a font would produce), so
+results do not depend on which fonts are installed; pass --font to use a real one.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import ascii_common
+import emoji_common
+from ascii_common import MODE_CHARS, AsciiFrameOptions
+from emoji_common import EMOJI_SETS, MATCH_MODES, EmojiFrameOptions
+
+RESOLUTIONS = [(640, 360), (1280, 720), (1920, 1080)]
+FONT_SIZES = [6, 10, 16]
+EMOJI_SIZES = [16, 32]
+
+# Reduced sweep for a quick check
+QUICK_RESOLUTIONS = [(640, 360)]
+QUICK_FONT_SIZES = [10]
+QUICK_EMOJI_SIZES = [32]
+
+
+def synthetic_frames(width, height, count, seed=0):
+    """Smooth, moving RGB frames: blurred noise scrolled over a color gradient."""
+    rng = np.random.default_rng(seed)
+    noise = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), max(width, height) / 100)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    frames = []
+    for i in range(count):
+        shifted = np.roll(noise, i * max(1, width // 50), axis=1).astype(np.float32)
+        frames.append(np.clip(0.6 * shifted + 0.4 * gradient, 0, 255).astype(np.uint8))
+    return frames
+
+
+def write_synthetic_video(path, width, height, count, fps=24):
+    """Write synthetic frames to a video file with cv2.VideoWriter (mp4v)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+    for frame in synthetic_frames(width, height, count):
+        writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    writer.release()
+
+
+def char_size(font_size, font=None):
+    """Cell size for a font size: measured with a real font, else a typical monospace ratio."""
+    if font is not None:
+        return ascii_common.measure_font_metrics(font)
+    return max(1, round(font_size * 0.6)), max(1, round(font_size * 1.2))
+
+
+def ascii_options(mode, preserve_colors, font_size, font_path=None):
+    num_chars = len(MODE_CHARS[mode])
+    if font_path:
+        font = ascii_common.load_font(font_size, font_path)
+        char_w, char_h = char_size(font_size, font)
+        palette = ascii_common.pre_render_chars(font, char_w, char_h, (0, 0, 0), (255, 255, 255), mode)
+    else:
+        char_w, char_h = char_size(font_size)
+        rng = np.random.default_rng(num_chars)
+        palette = np.repeat(rng.integers(0, 256, (num_chars, char_h, char_w, 1), dtype=np.uint8), 3, axis=3)
+    return AsciiFrameOptions(char_palette=palette, char_w=char_w, char_h=char_h, num_chars=num_chars,
+                             preserve_colors=preserve_colors)
+
+
+def emoji_options(emoji_set, emoji_size, match):
+    num_emojis = len(EMOJI_SETS[emoji_set])
+    rng = np.random.default_rng(num_emojis)
+    palette = rng.integers(0, 256, (num_emojis, emoji_size, emoji_size, 3), dtype=np.uint8)
+    colors = palette.reshape(num_emojis, -1, 3).mean(axis=1)
+    return EmojiFrameOptions(emoji_palette=palette, emoji_colors=colors, emoji_size=emoji_size,
+                             num_emojis=num_emojis, match=match)
+
+
+def measure(render, frames, cells, repeats):
+    """Time render(frame) over frames; return ms/frame (median), cells/sec and peak MiB."""
+    render(frames[0])  # Warm up caches (LUTs, code paths)
+
+    times = []
+    for i in range(repeats):
+        frame = frames[i % len(frames)]
+        start = time.perf_counter()
+        render(frame)
+        times.append(time.perf_counter() - start)
+    median = float(np.median(times))
+
+    # Peak memory of one call, measured separately since tracing slows everything down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    render(frames[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ms_per_frame": median * 1000,
+        "ms_min": min(times) * 1000,
+        "cells_per_sec": cells / median if median > 0 else 0.0,
+        "peak_mib": peak / (1024 * 1024),
+    }
+
+
+def ascii_cases(resolutions, font_sizes, font_path=None):
+    for width, height in resolutions:
+        for font_size in font_sizes:
+            for mode in MODE_CHARS:
+                for preserve_colors in (False, True):
+                    name = f"ascii/{mode}/{'color' if preserve_colors else 'gray'}/fs{font_size}/{width}x{height}"
+                    params = {"kernel": "ascii", "mode": mode, "preserve_colors": preserve_colors,
+                              "font_size": font_size, "width": width, "height": height}
+                    yield name, params, lambda m=mode, p=preserve_colors, f=font_size: ascii_options(m, p, f, font_path)
+
+
+def emoji_cases(resolutions, emoji_sizes):
+    for width, height in resolutions:
+        for emoji_size in emoji_sizes:
+            for emoji_set in EMOJI_SETS:
+                for match in MATCH_MODES:
+                    name = f"emoji/{emoji_set}/{match}/e{emoji_size}/{width}x{height}"
+                    params = {"kernel": "emoji", "emoji_set": emoji_set, "match": match,
+                              "emoji_size": emoji_size, "width": width, "height": height}
+                    yield name, params, lambda s=emoji_set, e=emoji_size, m=match: emoji_options(s, e, m)
+
+
+def run_kernel_case(params, make_options, repeats):
+    options = make_options()
+    frames = synthetic_frames(params["width"], params["height"], 4)
+    if params["kernel"] == "ascii":
+        cells = (params["width"] // options.char_w) * (params["height"] // options.char_h)
+        return measure(lambda frame: ascii_common.process_frame(frame, options), frames, cells, repeats)
+    cells = (params["width"] // options.emoji_size) * (params["height"] // options.emoji_size)
+    return measure(lambda frame: emoji_common.process_frame(frame, options), frames, cells, repeats)
+
+
+def run_video_case(width, height, repeats, font_path=None):
+    """Decode a synthetic video with cv2.VideoCapture and render every frame (grayscale, fs10)."""
+    options = ascii_options("chars", False, 10, font_path)
+    cells = (width // options.char_w) * (height // options.char_h)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.mp4")
+        write_synthetic_video(path, width, height, repeats + 1)
+
+        capture = cv2.VideoCapture(path)
+        times = []
+        try:
+            while True:
+                start = time.perf_counter()
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                ascii_common.process_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), options)
+                times.append(time.perf_counter() - start)
+        finally:
+            capture.release()
+        if len(times) < 2:
+            raise RuntimeError("Could not decode the synthetic video")
+
+        # Peak memory of one decode and render, traced separately as in measure()
+        capture = cv2.VideoCapture(path)
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            ok, frame = capture.read()
+            if ok:
+                ascii_common.process_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), options)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            capture.release()
+    median = float(np.median(times[1:]))  # The first frame includes decoder start-up
+    return {"ms_per_frame": median * 1000, "ms_min": min(times[1:]) * 1000,
+            "cells_per_sec": cells / median if median > 0 else 0.0, "peak_mib": peak / (1024 * 1024)}
+
+
+def run(args):
+    resolutions = QUICK_RESOLUTIONS if args.quick else RESOLUTIONS
+    font_sizes = QUICK_FONT_SIZES if args.quick else FONT_SIZES
+    emoji_sizes = QUICK_EMOJI_SIZES if args.quick else EMOJI_SIZES
+
+    cases = []
+    if args.kernel in ("all", "ascii"):
+        cases += list(ascii_cases(resolutions, font_sizes, args.font))
+    if args.kernel in ("all", "emoji"):
+        cases += list(emoji_cases(resolutions, emoji_sizes))
+    if args.kernel in ("all", "video"):
+        cases += [(f"video/chars/gray/fs10/{w}x{h}", {"kernel": "video", "width": w, "height": h}, None) for w, h in resolutions]
+    if args.filter:
+        cases = [case for case in cases if args.filter in case[0]]
+
+    results = []
+    failures = []
+    for i, (name, params, make_options) in enumerate(cases, 1):
+        try:
+            if params["kernel"] == "video":
+                metrics = run_video_case(params["width"], params["height"], args.repeats, args.font)
+            else:
+                metrics = run_kernel_case(params, make_options, args.repeats)
+        except Exception as e:
+            print(f"[{i}/{len(cases)}] {name}: error: {e}")
+            failures.append({"name": name, "error": f"{type(e).__name__}: {e}"})
+            continue
+        results.append({"name": name, **params, **metrics})
+        print(f"[{i}/{len(cases)}] {name:<45} {metrics['ms_per_frame']:9.2f} ms/frame "
+              f"{metrics['cells_per_sec'] / 1e6:8.2f} Mcells/s {metrics['peak_mib']:7.1f} MiB")
+    return results, failures
+
+
+def compare(results, baseline, threshold, selected=None):
+    """
+    Print changes against a baseline. Return the names of cases slower than
+    1 + threshold and of baseline cases missing from results; selected (names of
+    the cases this run attempted) limits the missing check to those cases.
+    """
+    base = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with baseline (threshold {threshold:.0%}):")
+    for entry in results:
+        old = base.get(entry["name"])
+        if old is None or not old["ms_per_frame"]:
+            continue
+        ratio = entry["ms_per_frame"] / old["ms_per_frame"]
+        status = ""
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(entry["name"])
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(f"  {entry['name']:<45} {old['ms_per_frame']:9.2f} -> {entry['ms_per_frame']:9.2f} ms ({ratio - 1:+.1%}) {status}")
+    missing = set(base) - {entry["name"] for entry in results}
+    if selected is not None:
+        not_run = missing - set(selected)
+        missing &= set(selected)
+        if not_run:
+            print(f"  ({len(not_run)} baseline cases not selected)")
+    for name in sorted(missing):
+        print(f"  {name:<45} MISSING (no result in this run)")
+    return regressions + sorted(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ASCII and emoji render kernels")
+    parser.add_argument("-o", "--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON result file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown counted as a regression (default: 0.1 = 10%%)")
+    parser.add_argument("--kernel", choices=["all", "ascii", "emoji", "video"], default="all", help="Which benchmarks to run (default: all)")
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this text (e.g. 'ascii/chars' or '1280x720')")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed frames per case (default: 10)")
+    parser.add_argument("--quick", action="store_true", help="One resolution, font size and emoji size")
+    parser.add_argument("--font", default=None, help="Use this font file for ASCII palettes instead of synthetic glyphs")
+    args = parser.parse_args()
+
+    results, failures = run(args)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeats": args.repeats,
+        },
+        "results": results,
+        "failures": failures,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {len(results)} results to {args.output}")
+
+    if failures:
+        print(f"{len(failures)} case(s) failed:")
+        for failure in failures:
+            print(f"  {failure['name']}: {failure['error']}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        selected = [entry["name"] for entry in results] + [failure["name"] for failure in failures]
+        regressions = compare(results, baseline, args.threshold, selected)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%} or missing case(s)")
+            sys.exit(1)
+        print("No regressions")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
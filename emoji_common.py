@@ -8,6 +8,8 @@ import numpy as np
 import cv2
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 
+from profile_common import stage
+
 # Emoji sets
 EMOJI_SMILES = list("😀😃😄😁😆😅🤣😂🙂🙃😉😊😇🥰😍🤩😘😗☺😚😙🥲😋😛😜🤪😝🤑🤗🤭🤫🤔🤐🤨😐😑😶😏😒🙄😬🤥😌😔😪🤤😴😷🤒🤕🤢🤮🤧🥵🥶🥴😵🤯🤠🥳🥸😎🤓🧐😕😟🙁☹😮😯😲😳🥺🥹😦😧😨😰😥😢😭😱😖😣😞😓😩😫🥱😤😡😠🤬😈👿💀☠💩🤡👹👺👻👽👾🤖😺😸😹😻😼😽🙀😿😾")
 
@@ -34,6 +36,7 @@ class EmojiFrameOptions:
     num_emojis: int = None
     bg_color: tuple = (0, 0, 0)
     swap_dims: bool = False
+    match: str = "exact"  # Color matching: 'exact' (brute force), 'chunked' (same result, banded matmul) or 'lut' (quantized RGB lookup table)
 
 
 def get_emoji_average_color(emoji, font, size, bg_color):
@@ -69,7 +72,140 @@ def compute_emoji_colors(font, font_size, bg_color, emojis):
     return np.stack([get_emoji_average_color(e, font, font_size, bg_color) for e in emojis])
 
 
-def frame_to_emoji_text(frame, emoji_size, emojis, emoji_colors, swap_dims=False):
+# Bits per channel of the RGB lookup table used by the 'lut' matcher (32x32x32 bins).
+# A pixel is at most 4 levels per channel (4 * sqrt(3) ~ 6.9 in RGB distance) from
+# its bin center, so the chosen emoji is at most 2 * 6.9 ~ 13.9 further from the
+# pixel than the exact nearest emoji.
+LUT_BITS = 5
+
+MATCH_MODES = ['exact', 'chunked', 'lut']
+
+# Memory budget for one row band of the 'chunked' matcher's distance matrix
+MATCH_BAND_BYTES = 8 * 1024 * 1024
+
+# float32 brute-force distances are within ~0.05 of the true value (< 2^18 with a
+# 2^-6 ulp), so candidates closer than this are re-checked with the brute-force
+# formula to reproduce its choice exactly, including first-index tie-breaking
+_CHUNKED_RECHECK_MARGIN = 1.0
+
+# Lookup tables keyed by (bits, emoji colors), built once per palette
+_color_lut_cache = {}
+
+
+def build_color_lut(emoji_colors, bits=LUT_BITS):
+    """
+    Build a quantized RGB -> emoji index lookup table.
+    Each bin holds the emoji nearest to the bin center.
+    Returns uint16 array of shape (2**bits, 2**bits, 2**bits).
+    """
+    levels = 1 << bits
+    step = 256 // levels
+    centers = np.arange(levels, dtype=np.float32) * step + (step - 1) / 2.0
+    r, g, b = np.meshgrid(centers, centers, centers, indexing="ij")
+    bin_colors = np.stack([r, g, b], axis=-1).reshape(-1, 3)
+
+    # Match in chunks so the (bins, num_emojis, 3) difference tensor stays small
+    lut = np.empty(len(bin_colors), dtype=np.uint16)
+    chunk = 4096
+    for start in range(0, len(bin_colors), chunk):
+        diff = bin_colors[start:start + chunk, np.newaxis, :] - emoji_colors[np.newaxis, :, :]
+        lut[start:start + chunk] = np.argmin(np.sum(diff ** 2, axis=-1), axis=-1)
+
+    return lut.reshape(levels, levels, levels)
+
+
+def get_color_lut(emoji_colors, bits=LUT_BITS):
+    """Return the cached lookup table for emoji_colors, building it on first use."""
+    emoji_colors = np.ascontiguousarray(emoji_colors, dtype=np.float32)
+    key = (bits, emoji_colors.shape, emoji_colors.tobytes())
+    lut = _color_lut_cache.get(key)
+    if lut is None:
+        lut = build_color_lut(emoji_colors, bits)
+        _color_lut_cache[key] = lut
+    return lut
+
+
+def match_emojis(img_small, emoji_colors, match="exact"):
+    """
+    Find the emoji with the closest average color for every cell.
+    
+    Args:
+        img_small: uint8 array of shape (rows, cols, 3) - one RGB color per cell
+        emoji_colors: array of shape (num_emojis, 3)
+        match: 'exact' (brute-force squared distance), 'chunked' (same result as
+            'exact', computed with a banded matrix multiply) or 'lut' (quantized lookup table)
+    
+    Returns:
+        int array of shape (rows, cols) - emoji indices
+    """
+    if match == "lut":
+        shift = 8 - LUT_BITS
+        lut = get_color_lut(emoji_colors)
+        quantized = img_small >> shift
+        return lut[quantized[:, :, 0], quantized[:, :, 1], quantized[:, :, 2]]
+
+    if match == "chunked":
+        return _match_chunked(img_small, emoji_colors)
+
+    if match != "exact":
+        raise ValueError(f"Unknown match mode: {match}")
+
+    return _match_bruteforce(img_small.astype(np.float32), emoji_colors)
+
+
+def _match_bruteforce(img_small, emoji_colors):
+    """Nearest emoji by full squared-distance tensor. img_small has shape (..., 3)."""
+    # Find closest emoji for each cell by color distance
+    # img_small: (rows, cols, 3)
+    # emoji_colors: (num_emojis, 3)
+    
+    # Expand dims for broadcasting
+    img_expanded = img_small[..., np.newaxis, :]  # (rows, cols, 1, 3)
+    
+    # Calculate squared color distance
+    diff = img_expanded - emoji_colors  # (rows, cols, num_emojis, 3)
+    distances = np.sum(diff ** 2, axis=-1)  # (rows, cols, num_emojis)
+    
+    # Find index of closest emoji
+    return np.argmin(distances, axis=-1)  # (rows, cols)
+
+
+def _match_chunked(img_small, emoji_colors):
+    """
+    Nearest emoji via ||a||^2 - 2a.b + ||b||^2, one matrix multiply per band of rows.
+    Peak memory is bounded by MATCH_BAND_BYTES instead of rows * cols * num_emojis * 3.
+    Returns the same indices as the brute-force matcher.
+    """
+    rows, cols = img_small.shape[:2]
+    num_emojis = len(emoji_colors)
+    if num_emojis == 1:
+        return np.zeros((rows, cols), dtype=np.intp)
+
+    colors64 = np.asarray(emoji_colors, dtype=np.float64)
+    colors_sq = np.sum(colors64 ** 2, axis=1)
+    band_rows = max(1, MATCH_BAND_BYTES // (max(cols, 1) * num_emojis * 8))
+
+    indices = np.empty((rows, cols), dtype=np.intp)
+    for start in range(0, rows, band_rows):
+        band = img_small[start:start + band_rows].reshape(-1, 3)
+        band64 = band.astype(np.float64)
+
+        # ||a||^2 is the same for every emoji, so it cannot change the argmin
+        distances = colors_sq - 2.0 * (band64 @ colors64.T)  # (band cells, num_emojis)
+        best = np.argmin(distances, axis=1)
+
+        # Re-check near ties with the brute-force formula so results are identical
+        nearest_two = np.partition(distances, 1, axis=1)
+        ambiguous = (nearest_two[:, 1] - nearest_two[:, 0]) < _CHUNKED_RECHECK_MARGIN
+        if ambiguous.any():
+            best[ambiguous] = _match_bruteforce(band[ambiguous].astype(np.float32), emoji_colors)
+
+        indices[start:start + band_rows] = best.reshape(-1, cols)
+
+    return indices
+
+
+def frame_to_emoji_text(frame, emoji_size, emojis, emoji_colors, swap_dims=False, match="exact"):
     """Convert a frame to an emoji-art string by nearest color matching."""
     h, w = frame.shape[:2]
     if swap_dims:
@@ -77,13 +213,8 @@ def frame_to_emoji_text(frame, emoji_size, emojis, emoji_colors, swap_dims=False
     cols = w // emoji_size
     rows = h // emoji_size
 
-    img_small = cv2.resize(frame, (cols, rows), interpolation=cv2.INTER_AREA).astype(np.float32)
-
-    img_expanded = img_small[:, :, np.newaxis, :]
-    colors_expanded = emoji_colors[np.newaxis, np.newaxis, :, :]
-    diff = img_expanded - colors_expanded
-    distances = np.sum(diff ** 2, axis=-1)
-    indices = np.argmin(distances, axis=-1)
+    img_small = cv2.resize(frame, (cols, rows), interpolation=cv2.INTER_AREA)
+    indices = match_emojis(img_small, emoji_colors, match)
 
     return "\n".join("".join(emojis[idx] for idx in row) for row in indices)
 
@@ -186,9 +317,11 @@ def add_common_arguments(parser, input_help="Path to input file", output_help="P
     parser.add_argument("--bg-color", help="Background color (e.g., 'black', '#000000')", default="black")
     parser.add_argument("--emoji-set", choices=['all', 'smiles', 'food', 'animals'], default='all',
                         help="Emoji set to use (default: all)")
+    parser.add_argument("--match", choices=MATCH_MODES, default='exact',
+                        help="Color matching: 'exact' (default), 'chunked' (same result, banded matrix multiply, low memory) or 'lut' (cached 32x32x32 RGB lookup table, fastest)")
 
 
-def process_frame(frame, options):
+def process_frame(frame, options, profiler=None):
     """
     Process a single frame (numpy array) into emoji art.
     Selects emojis based on color matching.
@@ -196,6 +329,7 @@ def process_frame(frame, options):
     Args:
         frame: numpy array of shape (h, w, 3) - RGB image
         options: EmojiFrameOptions object
+        profiler: optional StageProfiler timing the resize, indices and gather stages
     
     Returns:
         numpy array of shape (rows * emoji_size, cols * emoji_size, 3)
@@ -211,28 +345,19 @@ def process_frame(frame, options):
     num_emojis = options.num_emojis if options.num_emojis is not None else len(options.emoji_palette)
     
     # Resize RGB frame to grid size
-    img_small = cv2.resize(frame, (cols, rows), interpolation=cv2.INTER_AREA).astype(np.float32)
-    
-    # Find closest emoji for each cell by color distance
-    # img_small: (rows, cols, 3)
-    # emoji_colors: (num_emojis, 3)
-    
-    # Expand dims for broadcasting
-    img_expanded = img_small[:, :, np.newaxis, :]  # (rows, cols, 1, 3)
-    colors_expanded = options.emoji_colors[np.newaxis, np.newaxis, :, :]  # (1, 1, num_emojis, 3)
-    
-    # Calculate squared color distance
-    diff = img_expanded - colors_expanded  # (rows, cols, num_emojis, 3)
-    distances = np.sum(diff ** 2, axis=-1)  # (rows, cols, num_emojis)
+    with stage(profiler, "resize"):
+        img_small = cv2.resize(frame, (cols, rows), interpolation=cv2.INTER_AREA)
     
     # Find index of closest emoji
-    indices = np.argmin(distances, axis=-1)  # (rows, cols)
-    
-    # Get selected emojis
-    tiled_emojis = options.emoji_palette[indices]  # (rows, cols, size, size, 3)
+    with stage(profiler, "indices"):
+        indices = match_emojis(img_small, options.emoji_colors, options.match)
     
-    # Stitch together
-    tiled_emojis = tiled_emojis.swapaxes(1, 2)
-    final_frame = tiled_emojis.reshape(rows * size, cols * size, 3)
+    with stage(profiler, "gather"):
+        # Get selected emojis
+        tiled_emojis = options.emoji_palette[indices]  # (rows, cols, size, size, 3)
+        
+        # Stitch together
+        tiled_emojis = tiled_emojis.swapaxes(1, 2)
+        final_frame = tiled_emojis.reshape(rows * size, cols * size, 3)
     
     return final_frame
@@ -1,31 +1,47 @@
 import argparse
 import sys
 import os
+import functools
 import numpy as np
-import cv2
 from PIL import Image
 from emoji_common import (
     EMOJI_SETS, pre_render_emojis, compute_emoji_colors, frame_to_emoji_text,
     load_emoji_font, parse_colors, process_frame, EmojiFrameOptions, add_common_arguments
 )
+from batch_common import load_image, is_batch_input, convert_batch
+
+
+def build_options(font, font_size, emoji_size=32, bg_color=(0, 0, 0), emoji_set='all', match='exact'):
+    """Pre-render the emoji palette. Returns EmojiFrameOptions."""
+    emojis = EMOJI_SETS[emoji_set]
+    emoji_palette, emoji_colors = pre_render_emojis(font, font_size, emoji_size, bg_color, emojis)
+    return EmojiFrameOptions(
+        emoji_palette=emoji_palette,
+        emoji_colors=emoji_colors,
+        emoji_size=emoji_size,
+        num_emojis=len(emojis),
+        bg_color=bg_color,
+        swap_dims=False,
+        match=match
+    )
+
+
+def render_image_file(image_path, options, output_path, scale=1.0, emoji_set='all'):
+    """
+    Batch worker: render one image with prepared options.
+    Returns the rendered image, or emoji text when output_path ends in .txt.
+    """
+    frame = load_image(image_path, scale)
+    if output_path.lower().endswith(".txt"):
+        return frame_to_emoji_text(frame, options.emoji_size, EMOJI_SETS[emoji_set], options.emoji_colors, match=options.match)
+    return process_frame(frame, options)
 
 
 def process_image(image_path, font, font_size, output_path, emoji_size=32, scale=1.0, bg_color=(0, 0, 0),
-                  emoji_set='all'):
+                  emoji_set='all', match='exact'):
     """Process image to emoji art using color matching."""
-    # Load image
-    img = Image.open(image_path)
-    
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    frame = np.array(img)
-    
-    # Apply scale
-    if scale != 1.0:
-        h, w = frame.shape[:2]
-        new_h, new_w = int(h * scale), int(w * scale)
-        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    # Load image (RGB, scaled)
+    frame = load_image(image_path, scale)
     
     h, w = frame.shape[:2]
     cols = w // emoji_size
@@ -43,7 +59,7 @@ def process_image(image_path, font, font_size, output_path, emoji_size=32, scale
         print("Computing emoji colors...")
         emoji_colors = compute_emoji_colors(font, font_size, bg_color, emojis)
         print("Rendering text...")
-        text = frame_to_emoji_text(frame, emoji_size, emojis, emoji_colors)
+        text = frame_to_emoji_text(frame, emoji_size, emojis, emoji_colors, match=match)
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(text)
         print(f"Saved to {output_path}")
@@ -51,20 +67,10 @@ def process_image(image_path, font, font_size, output_path, emoji_size=32, scale
 
     # Pre-render emoji palette and get colors
     print("Pre-rendering emojis...")
-    emoji_palette, emoji_colors = pre_render_emojis(font, font_size, emoji_size, bg_color, emojis)
-    num_emojis = len(emojis)
+    options = build_options(font, font_size, emoji_size, bg_color, emoji_set, match)
     
     print("Rendering image...")
     
-    options = EmojiFrameOptions(
-        emoji_palette=emoji_palette,
-        emoji_colors=emoji_colors,
-        emoji_size=emoji_size,
-        num_emojis=num_emojis,
-        bg_color=bg_color,
-        swap_dims=False
-    )
-    
     final_image = process_frame(frame, options)
     
     output_img = Image.fromarray(final_image.astype(np.uint8))
@@ -74,19 +80,33 @@ def process_image(image_path, font, font_size, output_path, emoji_size=32, scale
 
 def main():
     parser = argparse.ArgumentParser(description="Emoji Image Generator")
-    add_common_arguments(parser, input_help="Path to input image file", output_help="Path to output image file")
+    add_common_arguments(parser, input_help="Path to input image file, or a directory / quoted glob (e.g. 'photos/*.jpg') for batch mode", output_help="Path to output image file (batch mode: output directory, default: next to the inputs)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch mode: number of worker processes (default: CPU count)")
+    parser.add_argument("--output-ext", default=None, help="Batch mode: output file extension, e.g. png or txt (default: same as input)")
     args = parser.parse_args()
-    
-    if args.output is None:
+
+    batch = is_batch_input(args.input)
+
+    if args.output is None and not batch:
         base, ext = os.path.splitext(args.input)
         args.output = f"{base}_emoji{ext}"
     
     bg_color = parse_colors(args.bg_color)
     font, font_size = load_emoji_font(args.emoji_size)
+
+    if batch:
+        try:
+            # The palette is built once and shared with every worker
+            options = build_options(font, font_size, args.emoji_size, bg_color, args.emoji_set, args.match)
+            render = functools.partial(render_image_file, scale=args.scale, emoji_set=args.emoji_set)
+            convert_batch(args.input, args.output, render, options, "_emoji", args.output_ext, args.workers)
+        except Exception as e:
+            print(f"Error: {e}")
+        return
     
     try:
         process_image(args.input, font, font_size, args.output, args.emoji_size, args.scale, bg_color,
-                      args.emoji_set)
+                      args.emoji_set, args.match)
     except Exception as e:
         print(f"Error: {e}")
         raise
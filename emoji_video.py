@@ -16,6 +16,8 @@ from emoji_common import (
     EMOJI_SETS, pre_render_emojis, load_emoji_font, parse_colors,
     process_frame, EmojiFrameOptions, add_common_arguments
 )
+from video_common import StreamingVideoWriter
+from profile_common import StageProfiler, profiled_frames
 
 
 def get_video_rotation(video_path):
@@ -50,8 +52,12 @@ def get_video_rotation(video_path):
 
 
 def process_video(clip, font, font_size, output_path, emoji_size=32, scale=1.0, video_path=None,
-                  bg_color=(0, 0, 0), emoji_set='all'):
-    """Process video to emoji art using color matching."""
+                  bg_color=(0, 0, 0), emoji_set='all', match='exact', profile=None):
+    """
+    Process video to emoji art using color matching.
+    If profile is a path, frames are encoded as they are rendered, with
+    per-stage timing and memory tracing, and a JSON summary is written there.
+    """
     
     # Resize
     if scale != 1.0:
@@ -95,9 +101,29 @@ def process_video(clip, font, font_size, output_path, emoji_size=32, scale=1.0,
         emoji_size=emoji_size,
         num_emojis=num_emojis,
         bg_color=bg_color,
-        swap_dims=swap_dims
+        swap_dims=swap_dims,
+        match=match
     )
     
+    if profile:
+        print(f"Resulting video resolution: {cols * emoji_size}x{rows * emoji_size}")
+        print("Rendering and encoding frames (profiled)...")
+        profiler = StageProfiler()
+        profiler.start()
+        with StreamingVideoWriter(output_path, clip.fps, audio=clip.audio) as writer:
+            for frame in tqdm(profiled_frames(clip.iter_frames(), profiler), total=int(clip.fps * clip.duration)):
+                final_frame = process_frame(frame, options, profiler)
+                with profiler.stage("encode"):
+                    writer.write_frame(final_frame)
+                profiler.end_frame()
+        profiler.stop()
+        profiler.print_report()
+        profiler.write_json(profile, video=video_path, grid=[cols, rows], emoji_size=emoji_size,
+                            emoji_set=emoji_set, match=match)
+        print(f"Profile saved to {profile}")
+        print(f"Saved to {output_path}")
+        return
+
     processed_frames = []
     
     print("Rendering frames...")
@@ -120,11 +146,14 @@ def process_video(clip, font, font_size, output_path, emoji_size=32, scale=1.0,
 def main():
     parser = argparse.ArgumentParser(description="Emoji Video Generator")
     add_common_arguments(parser, input_help="Path to input video file", output_help="Path to output video file")
+    parser.add_argument("--profile", nargs="?", const="", default=None, help="Time decode, resize, indices, gather and encode per frame, trace peak memory, and write a JSON summary (default path: {output}_profile.json)")
     args = parser.parse_args()
     
     if args.output is None:
         base, ext = os.path.splitext(args.input)
         args.output = f"{base}_emoji{ext}"
+    if args.profile == "":
+        args.profile = f"{os.path.splitext(args.output)[0]}_profile.json"
     
     bg_color = parse_colors(args.bg_color)
     font, font_size = load_emoji_font(args.emoji_size)
@@ -132,7 +161,7 @@ def main():
     try:
         clip = VideoFileClip(args.input)
         process_video(clip, font, font_size, args.output, args.emoji_size, args.scale, video_path=args.input,
-                      bg_color=bg_color, emoji_set=args.emoji_set)
+                      bg_color=bg_color, emoji_set=args.emoji_set, match=args.match, profile=args.profile)
     except Exception as e:
         print(f"Error: {e}")
         raise
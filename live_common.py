@@ -0,0 +1,220 @@
+"""
+Live sources for real-time rendering: capture devices (V4L2, webcams, streams)
+read through cv2.VideoCapture, and a synthetic test pattern that needs no camera.
+"""
+import time
+import threading
+
+import cv2
+import numpy as np
+
+
+class SyntheticCapture:
+    """
+    Test-pattern source with the same interface as cv2.VideoCapture
+    (isOpened / read / get / release).
+
+    Frames are BGR color bars with a moving gradient and a bouncing disc, produced
+    at the given fps: read() blocks until the next frame is due, like a camera.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = 0
+        self._start = None
+        self._opened = True
+
+        # Static part: eight color bars in the top half
+        bars = np.array([[255, 255, 255], [0, 255, 255], [255, 255, 0], [0, 255, 0],
+                         [255, 0, 255], [0, 0, 255], [255, 0, 0], [0, 0, 0]], dtype=np.uint8)
+        bar_index = np.arange(width) * len(bars) // width
+        self._bars = np.broadcast_to(bars[bar_index], (height // 2, width, 3))
+        self._ramp = (np.arange(width) * 255 // max(width - 1, 1)).astype(np.uint8)
+        self._yy, self._xx = np.mgrid[0:height - height // 2, 0:width]
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        if self._start is None:
+            self._start = time.perf_counter()
+        delay = self._start + self.frame_count / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        t = self.frame_count / self.fps
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame[:self.height // 2] = self._bars
+        # Bottom half: scrolling gray ramp with a bouncing disc
+        bottom = frame[self.height // 2:]
+        bottom[:] = np.roll(self._ramp, int(t * self.width / 4))[None, :, None]
+        cx = (0.5 + 0.4 * np.sin(t * 2.0)) * self.width
+        cy = (0.5 + 0.4 * np.cos(t * 3.0)) * bottom.shape[0]
+        radius = max(2, bottom.shape[0] // 4)
+        bottom[(self._xx - cx) ** 2 + (self._yy - cy) ** 2 < radius ** 2] = (0, 0, 255)
+
+        self.frame_count += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def release(self):
+        self._opened = False
+
+
+def parse_size(size_str):
+    """Parse 'WIDTHxHEIGHT' into (width, height)."""
+    try:
+        width, height = (int(part) for part in size_str.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid size '{size_str}', expected WIDTHxHEIGHT (e.g. 640x480)")
+    return width, height
+
+
+def open_capture(source, size=None, fps=None):
+    """
+    Open a live source.
+    source is 'test' for the synthetic pattern, a device index ('0') or a device
+    path / stream URL ('/dev/video0'). size is an optional (width, height) request.
+    """
+    if source == "test":
+        width, height = size or (640, 480)
+        return SyntheticCapture(width, height, fps or 30.0)
+
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open capture source '{source}'")
+    # Keep the driver queue short; older frames only add latency
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    if size:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+    if fps:
+        capture.set(cv2.CAP_PROP_FPS, fps)
+    return capture
+
+
+class LatestFrameReader:
+    """
+    Read a capture on a background thread, keeping only the newest frame.
+
+    Frames that are replaced before the consumer takes them are counted in
+    frames_skipped, so a slow renderer always works on the most recent frame
+    instead of a growing backlog. Frames are converted to RGB and stamped with
+    the perf_counter time at which they were captured.
+    """
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.frames_captured = 0
+        self.frames_skipped = 0
+        self._frame = None
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._ended = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ok, frame = self.capture.read()
+                captured_at = time.perf_counter()
+                if not ok:
+                    break
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                with self._condition:
+                    if self._frame is not None:
+                        self.frames_skipped += 1
+                    self._frame = (frame, captured_at)
+                    self.frames_captured += 1
+                    self._condition.notify()
+        finally:
+            with self._condition:
+                self._ended = True
+                self._condition.notify()
+
+    @property
+    def ended(self):
+        return self._ended
+
+    def get(self, timeout=None):
+        """Wait for the next frame; returns (frame, captured_at) or None when the source ended."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._frame is not None or self._ended, timeout):
+                return None
+            item, self._frame = self._frame, None
+            return item
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self.capture.release()
+
+
+class LatencyStats:
+    """Per-frame capture-to-display latency, reported as percentiles."""
+
+    def __init__(self):
+        self.latencies = []
+        self.frames_stale = 0
+
+    def add(self, latency):
+        self.latencies.append(latency)
+
+    def percentile(self, q):
+        return float(np.percentile(self.latencies, q)) if self.latencies else 0.0
+
+    def print_report(self, reader=None):
+        print(f"Frames shown: {len(self.latencies)}")
+        if reader is not None:
+            print(f"Frames captured: {reader.frames_captured}, skipped while busy: {reader.frames_skipped}")
+        print(f"Stale frames dropped: {self.frames_stale}")
+        if self.latencies:
+            print(f"Latency: p50 {self.percentile(50) * 1000:.1f} ms, p99 {self.percentile(99) * 1000:.1f} ms, max {max(self.latencies) * 1000:.1f} ms")
+
+
+def run_live(capture, show_frame, latency_budget=None, max_frames=None, duration=None):
+    """
+    Render frames from a live capture until it ends, show_frame(frame) returns False,
+    max_frames are shown or duration seconds pass (Ctrl+C also stops).
+
+    show_frame renders and displays one RGB frame. Frames already older than
+    latency_budget seconds when they are taken are dropped as stale.
+    Returns (LatencyStats, LatestFrameReader).
+    """
+    stats = LatencyStats()
+    reader = LatestFrameReader(capture)
+    start = time.perf_counter()
+    try:
+        while max_frames is None or len(stats.latencies) < max_frames:
+            if duration is not None and time.perf_counter() - start >= duration:
+                break
+            item = reader.get(timeout=1.0)
+            if item is None:
+                if reader.ended:
+                    break
+                continue
+            frame, captured_at = item
+            if latency_budget is not None and time.perf_counter() - captured_at > latency_budget:
+                stats.frames_stale += 1
+                continue
+            if show_frame(frame) is False:
+                break
+            stats.add(time.perf_counter() - captured_at)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.stop()
+    return stats, reader
@@ -0,0 +1,252 @@
+"""
+Persistent on-disk cache for font metrics and pre-rendered character palettes.
+
+Entries are content-addressed: the key hashes the font file contents, font size
+and face index, colors, mode, Pillow version and CACHE_VERSION, so a changed font
+file or renderer never returns stale data. The cache directory is bounded to
+CACHE_MAX_BYTES; least recently used entries are evicted first.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+import numpy as np
+import PIL
+
+from ascii_common import measure_font_metrics, pre_render_chars, load_font, select_chars, AsciiFrameOptions
+
+# Bump when measure_font_metrics or pre_render_chars change their output
+CACHE_VERSION = 1
+
+# Upper bound on the total size of the cache directory
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Names of files this cache writes: entries named by _cache_key, and the
+# temporary files _write_atomic leaves behind if a process dies mid-write
+_ENTRY_NAME = re.compile(r"^(metrics-[0-9a-f]{32}\.json|palette-[0-9a-f]{32}\.npy)(\.\d+\.tmp)?$")
+
+# Font hashes keyed by (path, mtime, size) so a font is read at most once per process
+_font_hash_memo = {}
+
+
+def get_cache_dir():
+    """Return the cache directory ($ASCII_VIDEO_CACHE_DIR or ~/.cache/ascii_video)."""
+    cache_dir = os.environ.get("ASCII_VIDEO_CACHE_DIR")
+    if cache_dir is None:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+        cache_dir = os.path.join(base, "ascii_video")
+    return cache_dir
+
+
+def font_fingerprint(font):
+    """
+    Return a string identifying the font file contents, size and face,
+    or None if the font cannot be identified (e.g. a bitmap default font).
+    """
+    path = getattr(font, "path", None)
+    size = getattr(font, "size", None)
+    if path is None or size is None:
+        return None
+
+    if isinstance(path, (str, os.PathLike)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        memo_key = (os.fspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = _font_hash_memo.get(memo_key)
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            _font_hash_memo[memo_key] = digest
+    elif hasattr(path, "getvalue"):
+        # Fonts loaded from memory (e.g. Pillow's built-in default font)
+        digest = hashlib.sha256(path.getvalue()).hexdigest()
+    else:
+        return None
+
+    return f"{digest}:{size}:{getattr(font, 'index', 0)}"
+
+
+def _cache_key(kind, **fields):
+    fields.update(kind=kind, version=CACHE_VERSION, pillow=PIL.__version__)
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def _touch(path):
+    # Reads refresh the mtime so eviction drops the least recently used entries
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cache_entries(cache_dir=None):
+    """Names of the files in cache_dir that belong to this cache; anything else is left alone."""
+    cache_dir = cache_dir or get_cache_dir()
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return []
+    return [name for name in names if _ENTRY_NAME.match(name)]
+
+
+def evict(cache_dir=None, max_bytes=CACHE_MAX_BYTES):
+    """Delete least recently used cache entries until they fit in max_bytes."""
+    cache_dir = cache_dir or get_cache_dir()
+    entries = []
+    for name in cache_entries(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def clear_cache(cache_dir=None):
+    """Remove every cache entry."""
+    evict(cache_dir, max_bytes=0)
+
+
+def cached_font_metrics(font):
+    """measure_font_metrics with a persistent cache. Returns (char_width, char_height)."""
+    fingerprint = font_fingerprint(font)
+    if fingerprint is None:
+        return measure_font_metrics(font)
+
+    path = os.path.join(get_cache_dir(), f"metrics-{_cache_key('metrics', font=fingerprint)}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _touch(path)
+        return data["char_w"], data["char_h"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    char_w, char_h = measure_font_metrics(font)
+    try:
+        payload = json.dumps({"char_w": char_w, "char_h": char_h}).encode("utf-8")
+        _write_atomic(path, lambda f: f.write(payload))
+        evict()
+    except OSError:
+        pass  # The cache is an optimization; never fail a render because of it
+    return char_w, char_h
+
+
+def cached_pre_render_chars(font, char_width, char_height, bg_color, fg_color, mode="chars"):
+    """pre_render_chars with a persistent cache. Returns (num_chars, h, w, 3) uint8 array."""
+    fingerprint = font_fingerprint(font)
+    if fingerprint is None:
+        return pre_render_chars(font, char_width, char_height, bg_color, fg_color, mode)
+
+    key = _cache_key("palette", font=fingerprint, char_w=char_width, char_h=char_height,
+                     bg_color=repr(bg_color), fg_color=repr(fg_color), mode=mode)
+    path = os.path.join(get_cache_dir(), f"palette-{key}.npy")
+    try:
+        palette = np.load(path)
+        _touch(path)
+        return palette
+    except (OSError, ValueError):
+        pass
+
+    palette = pre_render_chars(font, char_width, char_height, bg_color, fg_color, mode)
+    try:
+        _write_atomic(path, lambda f: np.save(f, palette))
+        evict()
+    except OSError:
+        pass
+    return palette
+
+
+class PaletteStore:
+    """
+    In-memory palettes shared by every request of a long-running process.
+
+    get_options returns AsciiFrameOptions for a (font size, mode, colors) key,
+    loading the font and palette (through the on-disk cache) the first time the
+    key is seen. Options are shared between threads and must not be modified;
+    use dataclasses.replace for per-request changes.
+    """
+
+    def __init__(self, font_path=None, use_cache=True):
+        self.font_path = font_path
+        self.use_cache = use_cache
+        self._options = {}
+        self._lock = threading.Lock()
+
+    def get_options(self, font_size=10, mode="chars", bg_color=(0, 0, 0), fg_color=(255, 255, 255),
+                    invert_brightness=False, preserve_colors=False, tint_color=None):
+        key = (font_size, mode, tuple(bg_color), tuple(fg_color), invert_brightness, preserve_colors,
+               tuple(tint_color) if tint_color else None)
+        with self._lock:
+            options = self._options.get(key)
+            if options is None:
+                font = load_font(font_size, self.font_path) if self.font_path else load_font(font_size)
+                if self.use_cache:
+                    char_w, char_h = cached_font_metrics(font)
+                    char_palette = cached_pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
+                else:
+                    char_w, char_h = measure_font_metrics(font)
+                    char_palette = pre_render_chars(font, char_w, char_h, bg_color, fg_color, mode)
+                options = AsciiFrameOptions(
+                    char_palette=char_palette,
+                    char_w=char_w,
+                    char_h=char_h,
+                    invert_brightness=invert_brightness,
+                    num_chars=len(select_chars(mode)),
+                    preserve_colors=preserve_colors,
+                    bg_color=bg_color,
+                    fg_color=fg_color,
+                    tint_color=tint_color
+                )
+                self._options[key] = options
+            return options
+
+    def __len__(self):
+        return len(self._options)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or clear the font metrics / palette cache")
+    parser.add_argument("--clear", action="store_true", help="Remove all cache entries")
+    args = parser.parse_args()
+
+    cache_dir = get_cache_dir()
+    if args.clear:
+        clear_cache(cache_dir)
+        print(f"Cleared {cache_dir}")
+        return
+
+    names = cache_entries(cache_dir)
+    total = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in names)
+    print(f"Cache: {cache_dir}")
+    print(f"Entries: {len(names)}, size: {total / 1024:.1f} KiB (limit {CACHE_MAX_BYTES / 1024 / 1024:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Per-stage timing and memory instrumentation for the render pipelines.
+
+process_frame in ascii_common and emoji_common accept an optional profiler and
+time their stages with it (resize, indices, gather); the video scripts add
+decode and encode. Peak allocations are tracked with tracemalloc.
+
+TraceRecorder has the same stage() interface and records each stage of each
+frame as a span in Chrome trace-event format (chrome://tracing, Perfetto), with
+one row per thread and worker process, plus queue depth counters.
+"""
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Shared no-op context for unprofiled calls
+_NO_STAGE = nullcontext()
+
+# Percentiles reported for every stage
+PERCENTILES = [50, 90, 99]
+
+
+def stage(profiler, name):
+    """Context manager timing a stage when profiler (StageProfiler or TraceRecorder) is set; free otherwise."""
+    if profiler is None:
+        return _NO_STAGE
+    return profiler.stage(name)
+
+
+class StageProfiler:
+    """
+    Collect wall time per stage for every frame, and peak memory per stage.
+
+    Usage:
+        profiler = StageProfiler()
+        profiler.start()
+        for ...:
+            with profiler.stage("decode"):
+                ...
+            profiler.end_frame()
+        profiler.stop()
+        profiler.write_json(path)
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.frames = []  # One {stage: seconds} dict per frame
+        self.stage_order = []
+        self.stage_peaks = {}  # Largest traced peak seen inside each stage, bytes
+        self.peak_bytes = 0
+        self.top_allocations = []
+        self.wall_time = 0.0
+        self._current = {}
+        self._start = None
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self._start
+        if self.trace_memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.top_allocations = [
+                {"location": str(stat.traceback), "size_mib": stat.size / (1024 * 1024), "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:10]
+            ]
+
+    @contextmanager
+    def stage(self, name):
+        if name not in self.stage_order:
+            self.stage_order.append(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._current[name] = self._current.get(name, 0.0) + time.perf_counter() - start
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.stage_peaks[name] = max(self.stage_peaks.get(name, 0), peak)
+                self.peak_bytes = max(self.peak_bytes, peak)
+
+    def end_frame(self):
+        self.frames.append(self._current)
+        self._current = {}
+
+    def summary(self):
+        """Per-stage totals, mean and percentiles (ms), plus peak memory (MiB)."""
+        stages = {}
+        total_staged = sum(sum(frame.values()) for frame in self.frames)
+        for name in self.stage_order:
+            times = np.array([frame.get(name, 0.0) for frame in self.frames]) * 1000
+            if not len(times):
+                continue
+            entry = {
+                "total_s": float(times.sum() / 1000),
+                "share": float(times.sum() / 1000 / total_staged) if total_staged else 0.0,
+                "mean_ms": float(times.mean()),
+                "max_ms": float(times.max()),
+            }
+            for q in PERCENTILES:
+                entry[f"p{q}_ms"] = float(np.percentile(times, q))
+            if name in self.stage_peaks:
+                entry["peak_mib"] = self.stage_peaks[name] / (1024 * 1024)
+            stages[name] = entry
+        return {
+            "frames": len(self.frames),
+            "wall_s": self.wall_time,
+            "fps": len(self.frames) / self.wall_time if self.wall_time else 0.0,
+            "peak_mib": self.peak_bytes / (1024 * 1024) if self.trace_memory else None,
+            "stages": stages,
+            "top_allocations": self.top_allocations,
+        }
+
+    def write_json(self, path, **meta):
+        summary = self.summary()
+        summary.update(meta)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    def print_report(self):
+        summary = self.summary()
+        print(f"Profile: {summary['frames']} frames in {summary['wall_s']:.2f}s ({summary['fps']:.1f} fps)")
+        for name, entry in summary["stages"].items():
+            line = f"  {name:<8} {entry['share']:6.1%}  mean {entry['mean_ms']:7.2f} ms  p50 {entry['p50_ms']:7.2f}  p99 {entry['p99_ms']:7.2f}"
+            if "peak_mib" in entry:
+                line += f"  peak {entry['peak_mib']:7.1f} MiB"
+            print(line)
+        if summary["stages"]:
+            bottleneck = max(summary["stages"], key=lambda name: summary["stages"][name]["total_s"])
+            print(f"Bottleneck: {bottleneck}")
+        if summary["peak_mib"] is not None:
+            print(f"Peak traced memory: {summary['peak_mib']:.1f} MiB")
+
+
+def profiled_frames(frames, profiler):
+    """Yield frames from an iterator, timing each fetch as the 'decode' stage."""
+    frames = iter(frames)
+    while True:
+        with profiler.stage("decode"):
+            frame = next(frames, None)
+        if frame is None:
+            return
+        yield frame
+
+
+def _trace_clock():
+    # perf_counter is a system-wide monotonic clock on Linux, macOS and Windows,
+    # so timestamps from worker processes line up with the parent's
+    return time.perf_counter_ns() / 1000
+
+
+class TraceRecorder:
+    """
+    Record spans and counters as Chrome trace events.
+
+    Spans are tagged with the frame index last passed to set_frame() on the
+    same thread. Recorders in worker processes hand their events to the parent
+    with drain(); the parent merges them with extend() and writes one file.
+
+    Usage:
+        tracer = TraceRecorder()
+        tracer.name_thread("decoder")
+        tracer.set_frame(i)
+        with tracer.stage("decode"):
+            ...
+        tracer.counter("queues", decode=3, encode=1)
+        tracer.write(path)
+    """
+
+    def __init__(self, process_name=None):
+        self.pid = os.getpid()
+        self.events = []  # list.append is atomic, so threads can share one recorder
+        self._local = threading.local()
+        if process_name:
+            self.events.append({"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                                "args": {"name": process_name}})
+
+    def name_thread(self, name):
+        """Label the calling thread's row in the trace viewer."""
+        self.events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": threading.get_native_id(),
+                            "args": {"name": name}})
+
+    def set_frame(self, index):
+        """Frame index attached to the calling thread's following spans."""
+        self._local.frame = index
+
+    @contextmanager
+    def stage(self, name):
+        start = _trace_clock()
+        try:
+            yield
+        finally:
+            self.events.append({"name": name, "cat": "stage", "ph": "X", "ts": start, "dur": _trace_clock() - start,
+                                "pid": self.pid, "tid": threading.get_native_id(),
+                                "args": {"frame": getattr(self._local, "frame", None)}})
+
+    def counter(self, name, **values):
+        """Record counter values (e.g. queue depths) at the current time."""
+        self.events.append({"name": name, "ph": "C", "ts": _trace_clock(), "pid": self.pid, "args": values})
+
+    def drain(self):
+        """Return and forget the events recorded so far."""
+        events, self.events = self.events, []
+        return events
+
+    def extend(self, events):
+        """Merge events recorded elsewhere (e.g. by a worker process)."""
+        self.events.extend(events)
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+def traced_frames(frames, tracer, name="decode"):
+    """Yield frames from an iterator, recording each fetch as a span tagged with its index."""
+    frames = iter(frames)
+    index = 0
+    while True:
+        tracer.set_frame(index)
+        with tracer.stage(name):
+            frame = next(frames, None)
+        if frame is None:
+            return
+        yield frame
+        index += 1
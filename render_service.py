@@ -0,0 +1,227 @@
+"""
+Long-running image render service.
+
+Keeps palettes warm (PaletteStore), merges concurrent requests with the same
+settings and image size into one process_frames call, and keeps rendered
+results in an LRU cache bounded by bytes.
+
+Usage:
+    service = RenderService()
+    image = service.render(frame, font_size=10, mode="chars")
+    future = service.submit(frame, preserve_colors=True)  # non-blocking
+    service.close()
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from ascii_common import process_frames
+from palette_cache import PaletteStore
+
+# Default upper bound on cached results
+RESULT_CACHE_BYTES = 256 * 1024 * 1024
+# Frames merged into one process_frames call at most
+MAX_BATCH = 16
+# How long the first request of a batch waits for others to join (seconds)
+BATCH_WINDOW = 0.005
+
+
+class ResultCache:
+    """Thread-safe LRU cache of numpy arrays, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if value.nbytes > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[key] = value
+            self.total_bytes += value.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def image_digest(frame):
+    """Content hash of an image array (pixels, shape and dtype)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((frame.shape, frame.dtype.str)).encode("ascii"))
+    digest.update(np.ascontiguousarray(frame).data)
+    return digest.hexdigest()
+
+
+class RenderService:
+    """
+    Render images to ASCII art from a single long-running process.
+
+    submit() returns a concurrent.futures.Future of the rendered (read-only)
+    RGB array. A dispatcher thread collects requests for BATCH_WINDOW seconds
+    after the first one arrives and renders each group of equal settings and
+    image size with one process_frames call. Identical requests in flight share
+    one render, and finished results are served from the ResultCache.
+
+    Args:
+        palettes: PaletteStore to share with other users (default: a new one)
+        cache_bytes: size bound of the result cache
+        max_batch: most frames per process_frames call
+        batch_window: seconds to wait for a batch to fill
+    """
+
+    def __init__(self, palettes=None, cache_bytes=RESULT_CACHE_BYTES, max_batch=MAX_BATCH, batch_window=BATCH_WINDOW):
+        self.palettes = palettes or PaletteStore()
+        self.cache = ResultCache(cache_bytes)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.requests = 0
+        self.batches = 0
+        self.frames_rendered = 0
+
+        self._pending = OrderedDict()  # (settings, shape) -> [first arrival, options, [(frame, cache key)]]
+        self._in_flight = {}  # cache key -> Future
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, font_size=10, mode="chars", bg_color=(0, 0, 0), fg_color=(255, 255, 255),
+               invert_brightness=False, preserve_colors=False, tint_color=None):
+        """Queue an RGB uint8 frame for rendering. Returns a Future of the rendered array."""
+        frame = np.asarray(frame, dtype=np.uint8)
+        settings = (font_size, mode, tuple(bg_color), tuple(fg_color), invert_brightness, preserve_colors,
+                    tuple(tint_color) if tint_color else None)
+        cache_key = (image_digest(frame), settings)
+        self.requests += 1
+
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        # Loading a palette for a new setting happens once, outside the dispatcher
+        options = self.palettes.get_options(*settings)
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("RenderService is closed")
+            future = self._in_flight.get(cache_key)
+            if future is not None:
+                return future
+            future = Future()
+            self._in_flight[cache_key] = future
+            group = self._pending.get((settings, frame.shape))
+            if group is None:
+                group = self._pending[(settings, frame.shape)] = [time.perf_counter(), options, []]
+            group[2].append((frame, cache_key))
+            self._condition.notify()
+        return future
+
+    def render(self, frame, **settings):
+        """Render one RGB frame and wait for the result."""
+        return self.submit(frame, **settings).result()
+
+    def _next_batch(self):
+        """Wait for a group whose window has passed (or that is full) and take up to max_batch frames."""
+        with self._condition:
+            while True:
+                if not self._pending:
+                    if self._closed:
+                        return None
+                    self._condition.wait()
+                    continue
+                group_key, (first_arrival, options, items) = next(iter(self._pending.items()))
+                remaining = first_arrival + self.batch_window - time.perf_counter()
+                if remaining > 0 and len(items) < self.max_batch and not self._closed:
+                    self._condition.wait(remaining)
+                    continue
+                batch, rest = items[:self.max_batch], items[self.max_batch:]
+                if rest:
+                    self._pending[group_key][2] = rest
+                    self._pending.move_to_end(group_key)
+                else:
+                    del self._pending[group_key]
+                return options, batch
+
+    def _dispatch(self):
+        while True:
+            work = self._next_batch()
+            if work is None:
+                return
+            options, batch = work
+            cache_keys = [cache_key for _, cache_key in batch]
+            try:
+                rendered = process_frames(np.stack([frame for frame, _ in batch]), options)
+            except Exception as e:
+                self._finish(cache_keys, error=e)
+                continue
+            self.batches += 1
+            self.frames_rendered += len(batch)
+            results = []
+            for cache_key, image in zip(cache_keys, rendered):
+                # Results are shared by every caller and the cache, so make them read-only
+                image = image.copy()
+                image.flags.writeable = False
+                self.cache.put(cache_key, image)
+                results.append(image)
+            self._finish(cache_keys, results)
+
+    def _finish(self, cache_keys, results=None, error=None):
+        with self._condition:
+            futures = [self._in_flight.pop(cache_key) for cache_key in cache_keys]
+        for i, future in enumerate(futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def stats(self):
+        """Request, batch and cache counters."""
+        return {
+            "requests": self.requests,
+            "frames_rendered": self.frames_rendered,
+            "batches": self.batches,
+            "mean_batch": self.frames_rendered / self.batches if self.batches else 0.0,
+            "cache_hits": self.cache.hits,
+            "cache_entries": len(self.cache),
+            "cache_bytes": self.cache.total_bytes,
+            "palettes": len(self.palettes),
+        }
+
+    def close(self):
+        """Render what is still queued and stop the dispatcher."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
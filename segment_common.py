@@ -0,0 +1,321 @@
+"""
+Segmented video rendering: split the input into time ranges that start on
+keyframes, let each worker process decode, render and encode its own range, and
+join the encoded segments with ffmpeg's concat demuxer.
+
+Every segment is encoded with the same codec settings, so joining copies the
+streams without re-encoding. The source audio is copied once while joining.
+Unlike render_frames_parallel, encoding runs in the workers too, so wall time
+keeps scaling with cores once a single libx264 encoder becomes the bottleneck.
+
+Finished segments are checkpointed in a work directory with a manifest keyed by
+the input file contents and the render options; a rerun with the same input and
+options renders only the missing segments.
+"""
+import os
+import re
+import glob
+import json
+import hashlib
+import subprocess
+from dataclasses import fields
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from tqdm import tqdm
+
+from moviepy.config import FFMPEG_BINARY
+
+from video_common import VideoFileClip, StreamingVideoWriter
+
+# Segments per worker by default, so uneven keyframe spacing still balances out
+SEGMENTS_PER_WORKER = 2
+
+# Bump when segment rendering or encoding changes its output
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def keyframe_times(video_path):
+    """
+    Presentation times (seconds) of the video keyframes, using ffmpeg to decode
+    keyframes only. Returns [0.0] if they cannot be determined.
+    """
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-nostats", "-skip_frame", "nokey", "-i", video_path,
+           "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+    except (OSError, subprocess.TimeoutExpired):
+        return [0.0]
+    times = sorted({float(t) for t in re.findall(r"pts_time:(-?[\d.]+)", result.stderr)})
+    return times or [0.0]
+
+
+def frame_count(duration, fps):
+    """Number of frames clip.iter_frames() yields for a clip."""
+    return len(np.arange(0, duration, 1.0 / fps))
+
+
+def plan_segments(total_frames, fps, keyframes, count):
+    """
+    Split frames [0, total_frames) into at most count (start, end) ranges.
+    Boundaries are evenly spaced targets moved to the nearest keyframe, so each
+    worker's seek lands on a keyframe; without usable keyframes they stay evenly
+    spaced (seeking then decodes from the previous keyframe, which is slower
+    but still exact).
+    """
+    count = max(1, min(count, total_frames))
+    keyframe_indices = sorted({int(round(t * fps)) for t in keyframes if 0 < round(t * fps) < total_frames})
+
+    boundaries = set()
+    for i in range(1, count):
+        target = total_frames * i // count
+        if keyframe_indices:
+            target = min(keyframe_indices, key=lambda index: abs(index - target))
+        boundaries.add(target)
+    edges = [0] + sorted(boundaries) + [total_frames]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+# Per-process state for segment workers, set once by the pool initializer
+_segment_render = None
+_segment_options = None
+
+
+def _init_segment_worker(render_func, options):
+    global _segment_render, _segment_options
+    _segment_render = render_func
+    _segment_options = options
+
+
+def _render_segment(video_path, scale, fps, start, end, output_path):
+    """Decode frames [start, end) of video_path, render them and encode them to output_path."""
+    clip = VideoFileClip(video_path, audio=False)
+    try:
+        if scale != 1.0:
+            try:
+                clip = clip.resize(scale)
+            except AttributeError:
+                clip = clip.resized(scale)
+        with StreamingVideoWriter(output_path, fps) as writer:
+            # The first get_frame seeks; the following ones read sequentially
+            for index in range(start, end):
+                writer.write_frame(_segment_render(clip.get_frame(index / fps), _segment_options))
+    finally:
+        clip.close()
+    return end - start
+
+
+def concat_segments(segment_paths, output_path, audio_source=None):
+    """
+    Join encoded segments with the concat demuxer, copying the video streams.
+    If audio_source is given, its first audio stream (if any) is copied in once.
+    """
+    list_path = f"{os.path.splitext(output_path)[0]}_segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            # The concat demuxer resolves relative paths against the list file
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    cmd = [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_source:
+        cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?"]
+    cmd += ["-c:v", "copy"]
+    try:
+        result = subprocess.run(cmd + ["-c:a", "copy", output_path], capture_output=True, text=True)
+        if result.returncode != 0 and audio_source:
+            # The source audio codec may not fit the output container
+            result = subprocess.run(cmd + ["-c:a", "aac", output_path], capture_output=True, text=True)
+    finally:
+        os.remove(list_path)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {result.stderr.strip()}")
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_fingerprint(options):
+    """Hash of every field of an options dataclass; arrays (palettes) by contents."""
+    digest = hashlib.sha256()
+    for field in fields(options):
+        value = getattr(options, field.name)
+        digest.update(field.name.encode("utf-8"))
+        if isinstance(value, np.ndarray):
+            digest.update(repr((value.shape, value.dtype.str)).encode("ascii"))
+            digest.update(np.ascontiguousarray(value).data)
+        else:
+            digest.update(repr(value).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def job_key(video_path, options, fps, scale, ext):
+    """Identify a segmented render by its input contents, options and output settings."""
+    key_fields = {
+        "input": file_digest(video_path),
+        "options": options_fingerprint(options),
+        "fps": fps,
+        "scale": scale,
+        "ext": ext,
+        "version": MANIFEST_VERSION,
+    }
+    return hashlib.sha256(json.dumps(key_fields, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+class SegmentJob:
+    """
+    Work directory of a segmented render: the encoded segments plus a manifest
+    with the job key, the segment plan and which segments are finished.
+
+    A segment file only appears once its encoder has closed (StreamingVideoWriter
+    renames it into place), and it is marked done in the manifest after that, so
+    a job killed at any point resumes from the last finished segment.
+    """
+
+    def __init__(self, work_dir, key, ext=".mp4"):
+        self.work_dir = work_dir
+        self.key = key
+        self.ext = ext
+        self.ranges = []
+        self.done = set()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.work_dir, MANIFEST_NAME)
+
+    def segment_path(self, index):
+        return os.path.join(self.work_dir, f"segment_{index:04d}{self.ext}")
+
+    def resume(self):
+        """
+        Load the manifest if it belongs to this job. Returns True if the job can
+        be resumed; segments whose files went missing are rendered again.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if manifest.get("key") != self.key:
+            return False
+        self.ranges = [tuple(r) for r in manifest["ranges"]]
+        self.done = {index for index in manifest["done"] if os.path.exists(self.segment_path(index))}
+        return True
+
+    def start(self, ranges):
+        """Begin a new job with this segment plan, discarding any previous segments."""
+        self._remove_files()
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.ranges = list(ranges)
+        self.done = set()
+        self.save()
+
+    def mark_done(self, index):
+        self.done.add(index)
+        self.save()
+
+    def save(self):
+        manifest = {"key": self.key, "ranges": self.ranges, "done": sorted(self.done)}
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def pending(self):
+        return [i for i in range(len(self.ranges)) if i not in self.done]
+
+    def frames_done(self):
+        return sum(self.ranges[i][1] - self.ranges[i][0] for i in self.done)
+
+    def _remove_files(self):
+        # Only touch files this job writes, in case work_dir holds anything else
+        for path in glob.glob(os.path.join(glob.escape(self.work_dir), "segment_*")) + [self.manifest_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def remove(self):
+        """Delete the segments and manifest, and the work directory if it is then empty."""
+        self._remove_files()
+        try:
+            os.rmdir(self.work_dir)
+        except OSError:
+            pass
+
+
+def render_video_segmented(video_path, output_path, render_func, options, fps, duration, scale=1.0,
+                           workers=None, segments=None, work_dir=None):
+    """
+    Render video_path to output_path in keyframe-aligned segments on a process pool.
+
+    Args:
+        video_path: input video file
+        output_path: output video file
+        render_func: module-level function called as render_func(frame, options)
+        options: options object shared by all workers (sent once per worker)
+        fps, duration: frame rate and duration of the input clip
+        scale: scale factor applied to frames before rendering
+        workers: number of worker processes (default: CPU count)
+        segments: number of segments (default: SEGMENTS_PER_WORKER per worker);
+            a resumed job keeps its original plan
+        work_dir: directory for finished segments and the manifest
+            (default: {output base}_segments); removed after a successful join
+    """
+    workers = workers or os.cpu_count() or 1
+    segments = segments or workers * SEGMENTS_PER_WORKER
+    total_frames = frame_count(duration, fps)
+
+    base, ext = os.path.splitext(output_path)
+    ext = ext or ".mp4"
+    work_dir = work_dir or f"{base}_segments"
+
+    print("Hashing input...")
+    job = SegmentJob(work_dir, job_key(video_path, options, fps, scale, ext), ext)
+    if job.resume():
+        print(f"Resuming from {work_dir}: {len(job.done)}/{len(job.ranges)} segments already rendered")
+    else:
+        keyframes = keyframe_times(video_path)
+        ranges = plan_segments(total_frames, fps, keyframes, segments)
+        print(f"Keyframes: {len(keyframes)}, segments: {len(ranges)}")
+        if len(keyframes) < 2 and len(ranges) > 1:
+            print("No keyframes inside the video; segments start between keyframes (slower seeks)")
+        job.start(ranges)
+
+    pending = job.pending()
+    if pending:
+        print(f"Workers: {min(workers, len(pending))}")
+        futures = {}
+        errors = []
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_segment_worker,
+                                     initargs=(render_func, options)) as pool:
+                for i in pending:
+                    future = pool.submit(_render_segment, video_path, scale, fps, *job.ranges[i], job.segment_path(i))
+                    futures[future] = i
+                with tqdm(total=total_frames, initial=job.frames_done()) as progress:
+                    # Keep collecting after a failure so every finished segment is checkpointed
+                    for future in as_completed(futures):
+                        try:
+                            progress.update(future.result())
+                        except Exception as e:
+                            errors.append((futures[future], e))
+                            continue
+                        job.mark_done(futures[future])
+        finally:
+            # Segments that finished while the pool shut down (e.g. after Ctrl+C) count too
+            for future, i in futures.items():
+                if i not in job.done and future.done() and not future.cancelled() and future.exception() is None:
+                    job.mark_done(i)
+        if errors:
+            print(f"{len(errors)} segment(s) failed; rerun to render only the missing segments")
+            raise errors[0][1]
+
+    print("Joining segments...")
+    concat_segments([job.segment_path(i) for i in range(len(job.ranges))], output_path, audio_source=video_path)
+    job.remove()
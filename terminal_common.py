@@ -0,0 +1,261 @@
+"""
+Common utilities for drawing ASCII frames in a terminal.
+"""
+import sys
+import time
+import math
+import shutil
+import numpy as np
+
+from ascii_common import indices_to_text, cells_to_ansi_text, fill_space_colors, space_mask, ansi_color
+
+# ANSI escape sequences
+CURSOR_HOME = "\x1b[H"
+CLEAR_SCREEN = "\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+RESET_ATTRIBUTES = "\x1b[0m"
+
+# Terminal cells are roughly twice as tall as they are wide
+CELL_ASPECT = 2.0
+
+# Default color quantization of DiffTerminalSink; finer steps make compression
+# noise redraw most colored cells every frame
+DIFF_COLOR_STEP = 16
+
+
+def fit_cell_size(w, h, columns=None, lines=None):
+    """
+    Choose the pixel size of one character cell so a w x h frame fits the terminal.
+    Keeps the terminal's ~1:2 cell aspect so the picture is not stretched.
+    One line is left free for the status line.
+    Returns (cell_w, cell_h).
+    """
+    if columns is None or lines is None:
+        size = shutil.get_terminal_size()
+        columns = columns or size.columns
+        lines = lines or size.lines
+    lines = max(1, lines - 1)
+
+    cell_w = max(1, math.ceil(w / columns))
+    cell_h = max(1, math.ceil(cell_w * CELL_ASPECT))
+    if h / cell_h > lines:
+        cell_h = max(1, math.ceil(h / lines))
+        cell_w = max(1, math.ceil(cell_h / CELL_ASPECT))
+    return cell_w, cell_h
+
+
+def cursor_to(row, col):
+    """Escape sequence moving the cursor to a 0-based cell."""
+    return f"\x1b[{row + 1};{col + 1}H"
+
+
+class TerminalSink:
+    """
+    Draws complete text frames from the top-left corner of the terminal.
+
+    Frames are given as a (rows, cols) grid of indices into chars, plus an
+    optional (rows, cols, 3) grid of 24-bit colors.
+    """
+
+    def __init__(self, chars, out=None):
+        self.chars = chars
+        self.out = out if out is not None else sys.stdout
+        self.bytes_written = 0
+        self.frames_drawn = 0
+        self.shape = None  # Grid shape of the frame on screen
+
+    def write(self, data):
+        self.out.write(data)
+        self.out.flush()
+        self.bytes_written += len(data.encode("utf-8"))
+
+    def full_frame(self, indices, colors=None):
+        """Escape sequences and text that redraw the whole frame."""
+        # A smaller grid would leave parts of the previous one on screen
+        prefix = CLEAR_SCREEN + CURSOR_HOME if indices.shape != self.shape else CURSOR_HOME
+        if colors is None:
+            return prefix + indices_to_text(indices, self.chars)
+        return prefix + cells_to_ansi_text(indices, colors, self.chars)
+
+    def draw(self, indices, colors=None):
+        """Draw one frame."""
+        self.write(self.full_frame(indices, colors))
+        self.shape = indices.shape
+        self.frames_drawn += 1
+
+    @property
+    def rows(self):
+        return self.shape[0] if self.shape else 0
+
+    def begin(self):
+        self.write(HIDE_CURSOR + CLEAR_SCREEN)
+
+    def finish(self):
+        """Restore attributes and cursor, leaving it below the last frame."""
+        self.write(RESET_ATTRIBUTES + cursor_to(self.rows, 0) + SHOW_CURSOR)
+
+
+class DiffTerminalSink(TerminalSink):
+    """
+    Terminal sink that only sends the cells that changed since the previous frame.
+
+    Changed cells are grouped into runs per row; each run costs one cursor
+    positioning sequence plus its characters (and color escapes where the color
+    changes). Unchanged gaps of up to MAX_GAP cells inside a run are re-sent,
+    which is cheaper than another cursor move. Spaces whose character did not
+    change are not redrawn for a color change, since their color is invisible.
+    When the diff would be larger than a full redraw, the full frame is sent.
+
+    Colors are quantized to multiples of color_step before the change test (and
+    drawn that way), so small color changes do not redraw a cell. With
+    color_step=1 nearly every colored cell changes between video frames and the
+    sink falls back to full redraws; it then only saves bytes in gray mode.
+    """
+
+    # Re-send up to this many unchanged cells rather than emitting a new cursor move
+    MAX_GAP = 6
+
+    def __init__(self, chars, out=None, color_step=DIFF_COLOR_STEP):
+        super().__init__(chars, out)
+        self.color_step = color_step
+        self.full_redraws = 0
+        self._indices = None
+        self._colors = None
+        self._full_bytes = None  # Size of the last full redraw, used as the cost estimate
+
+    def draw(self, indices, colors=None):
+        if colors is not None and self.color_step > 1:
+            colors = (colors // self.color_step) * self.color_step
+        prev_indices, prev_colors = self._indices, self._colors
+        self._indices, self._colors = indices, colors
+        self.frames_drawn += 1
+
+        if (prev_indices is None or prev_indices.shape != indices.shape
+                or (colors is None) != (prev_colors is None)):
+            self._draw_full(indices, colors)
+            return
+
+        changed = indices != prev_indices
+        if colors is not None:
+            colors = fill_space_colors(indices, colors, self.chars)
+            self._colors = colors
+            color_changed = np.any(colors != prev_colors, axis=-1)
+            changed |= color_changed & ~space_mask(indices, self.chars)
+
+        if not changed.any():
+            return
+
+        data = self._diff(indices, colors, changed)
+        if self._full_bytes is not None and len(data.encode("utf-8")) >= self._full_bytes:
+            self._draw_full(indices, colors)
+        else:
+            self.write(data)
+
+    def _draw_full(self, indices, colors):
+        data = self.full_frame(indices, colors)
+        self.shape = indices.shape
+        self._full_bytes = len(data.encode("utf-8"))
+        self.full_redraws += 1
+        self.write(data)
+
+    def _diff(self, indices, colors, changed):
+        rows, cols = changed.shape
+        changed_rows, changed_cols = np.nonzero(changed)
+
+        # Split changed cells into runs: a new run starts on a new row or after a long gap
+        new_run = np.ones(len(changed_rows), dtype=bool)
+        new_run[1:] = (changed_rows[1:] != changed_rows[:-1]) | (changed_cols[1:] - changed_cols[:-1] > self.MAX_GAP + 1)
+        run_begin = np.flatnonzero(new_run)
+        run_end = np.append(run_begin[1:], len(changed_rows)) - 1
+
+        text_rows = indices_to_text(indices, self.chars).split("\n")
+        if colors is not None:
+            color_starts = np.zeros((rows, cols), dtype=bool)
+            color_starts[:, 1:] = np.any(colors[:, 1:] != colors[:, :-1], axis=-1)
+
+        parts = []
+        for row, start, end in zip(changed_rows[run_begin].tolist(), changed_cols[run_begin].tolist(), changed_cols[run_end].tolist()):
+            parts.append(cursor_to(row, start))
+            row_text = text_rows[row]
+            if colors is None:
+                parts.append(row_text[start:end + 1])
+                continue
+            # The terminal's current color is unknown after a cursor move, so always set it
+            starts = [start] + (np.flatnonzero(color_starts[row, start + 1:end + 1]) + start + 1).tolist()
+            ends = starts[1:] + [end + 1]
+            for run_start, run_stop, color in zip(starts, ends, colors[row, starts].tolist()):
+                parts.append(ansi_color(color) + row_text[run_start:run_stop])
+        return "".join(parts)
+
+
+class TerminalPlayer:
+    """
+    Draw frames in the terminal in real time.
+
+    Each frame is drawn at its due time (index / fps) without clearing the
+    screen, which avoids flicker. When rendering falls behind the wall clock,
+    frames are dropped (not rendered) instead of letting playback drift.
+
+    Args:
+        fps: playback frame rate
+        sink: TerminalSink (or DiffTerminalSink) that draws the frames
+    """
+
+    def __init__(self, fps, sink):
+        self.fps = fps
+        self.sink = sink
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self.cells_per_frame = None  # Set to report bytes per cell
+        self.elapsed = 0.0
+
+    def play(self, frames, render_cells):
+        """
+        Play frames, converting each one with render_cells(frame) -> (indices, colors),
+        where colors may be None. Stops early on Ctrl+C.
+        Returns (frames_shown, frames_dropped).
+        """
+        frame_time = 1.0 / self.fps
+        self.sink.begin()
+        start = time.perf_counter()
+        try:
+            for index, frame in enumerate(frames):
+                due = start + index * frame_time
+                now = time.perf_counter()
+                # More than one frame late: skip it to catch up with the clock
+                if now > due + frame_time:
+                    self.frames_dropped += 1
+                    continue
+
+                indices, colors = render_cells(frame)
+
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self.sink.draw(indices, colors)
+                self.frames_shown += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.sink.finish()
+        return self.frames_shown, self.frames_dropped
+
+    def achieved_fps(self):
+        return self.frames_shown / self.elapsed if self.elapsed > 0 else 0.0
+
+    def print_report(self):
+        """Print achieved frame rate, dropped frames and output size."""
+        total = self.frames_shown + self.frames_dropped
+        dropped_pct = self.frames_dropped / total if total else 0.0
+        print(f"Played {self.frames_shown} frames in {self.elapsed:.1f}s: {self.achieved_fps():.1f} fps (target {self.fps:.1f})")
+        print(f"Dropped frames: {self.frames_dropped} ({dropped_pct:.1%})")
+        if self.frames_shown:
+            frame_bytes = self.sink.bytes_written / self.frames_shown
+            line = f"Average frame size: {frame_bytes / 1024:.1f} KiB"
+            if self.cells_per_frame:
+                line += f" ({frame_bytes / self.cells_per_frame:.2f} bytes/cell)"
+            print(line)
+        if isinstance(self.sink, DiffTerminalSink):
+            print(f"Full redraws: {self.sink.full_redraws}")
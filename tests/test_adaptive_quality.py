@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adaptive_quality import AdaptiveQuality, quality_scales
+
+
+def run(controller, finest_cost, frames):
+    """Feed render times from a cost model where cost falls with the square of the cell scale."""
+    levels = []
+    for _ in range(frames):
+        scale = controller.scales[controller.level]
+        controller.record(finest_cost / scale ** 2)
+        levels.append(controller.level)
+    return levels
+
+
+class AdaptiveQualityTest(unittest.TestCase):
+    def test_just_over_budget_settles_on_one_level(self):
+        # Level 0 costs 1.0x the budget, level 1 (1.5x cells) about 0.44x: under
+        # headroom, but stepping back to level 0 would put it over pressure again
+        controller = AdaptiveQuality(3, target_fps=10, patience=5)
+        levels = run(controller, finest_cost=0.1, frames=200)
+        self.assertEqual(controller.switches, 1)
+        self.assertEqual(set(levels[10:]), {1})
+
+    def test_boundary_between_coarser_levels(self):
+        # 2.0 -> 3.0 is also a 2.25x cost step
+        controller = AdaptiveQuality(5, target_fps=10, patience=5)
+        levels = run(controller, finest_cost=0.1 * 2.0 ** 2 * 1.05, frames=300)
+        self.assertEqual(set(levels[-100:]), {3})
+        self.assertEqual(controller.switches, 3)
+
+    def test_steps_back_when_finer_level_fits(self):
+        controller = AdaptiveQuality(3, target_fps=10, patience=5)
+        controller.level = 2
+        levels = run(controller, finest_cost=0.02, frames=50)
+        self.assertEqual(levels[-1], 0)
+
+    def test_default_scales(self):
+        self.assertEqual(AdaptiveQuality(4, 30).scales, quality_scales(4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_common import batch_jobs
+
+
+class BatchJobsTest(unittest.TestCase):
+    def test_outputs_next_to_inputs(self):
+        jobs = batch_jobs([os.path.join("a", "x.png"), os.path.join("b", "x.png")])
+        self.assertEqual([output for _, output in jobs],
+                         [os.path.join("a", "x_ascii.png"), os.path.join("b", "x_ascii.png")])
+
+    def test_same_name_in_output_dir_raises(self):
+        with self.assertRaises(ValueError):
+            batch_jobs([os.path.join("a", "x.png"), os.path.join("b", "x.png")], output_dir="out")
+
+    def test_same_base_with_output_ext_raises(self):
+        with self.assertRaises(ValueError):
+            batch_jobs(["x.png", "x.jpg"], output_ext="txt")
+
+    def test_previous_outputs_skipped(self):
+        jobs = batch_jobs(["x.png", "x_ascii.png"], output_dir="out")
+        self.assertEqual(jobs, [("x.png", os.path.join("out", "x_ascii.png"))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import palette_cache
+
+
+class CacheDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, size=16):
+        path = os.path.join(self.cache_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_clear_keeps_unrelated_files(self):
+        key = "0" * 32
+        entries = [self.write(f"metrics-{key}.json"), self.write(f"palette-{key}.npy"),
+                   self.write(f"palette-{key}.npy.1234.tmp")]
+        unrelated = [self.write("notes.txt"), self.write("palette-mine.npy"), self.write("metrics.json")]
+
+        palette_cache.clear_cache(self.cache_dir)
+
+        for path in entries:
+            self.assertFalse(os.path.exists(path), path)
+        for path in unrelated:
+            self.assertTrue(os.path.exists(path), path)
+
+    def test_evict_ignores_unrelated_files(self):
+        old = self.write(f"palette-{'1' * 32}.npy", size=100)
+        new = self.write(f"palette-{'2' * 32}.npy", size=100)
+        unrelated = self.write("big.bin", size=1000)
+        os.utime(old, (1, 1))
+
+        palette_cache.evict(self.cache_dir, max_bytes=150)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+        self.assertTrue(os.path.exists(unrelated))
+
+
+if __name__ == "__main__":
+    unittest.main()
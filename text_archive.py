@@ -0,0 +1,271 @@
+"""
+Compact text-video archive (.ascv): character grids instead of pixels.
+
+Layout:
+    header   magic, version, flags, grid size, fps, frames per block, character set
+    blocks   zlib-compressed runs of block_frames frames; the first frame of a block
+             is stored as is, every following frame is XORed with its predecessor,
+             so unchanged cells compress to runs of zero bytes
+    index    uint64 offset of every block, plus the end of the last block
+    trailer  frame count, index offset, block count, end magic
+
+Each frame is its (rows, cols) glyph-index grid, followed by the (rows, cols, 3)
+cell colors when the archive has colors. Blocks decode independently, so seeking
+to any frame reads the trailer and index (memory mapped) and decompresses one block.
+"""
+import os
+import sys
+import mmap
+import zlib
+import struct
+import numpy as np
+
+from ascii_common import indices_to_text, cells_to_ansi_text
+
+ARCHIVE_MAGIC = b"ASCV"
+ARCHIVE_END_MAGIC = b"ASCX"
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".ascv"
+
+FLAG_COLORS = 1
+FLAG_WIDE_INDICES = 2  # uint16 indices, for character sets of more than 256 glyphs
+
+# magic, version, flags, rows, cols, fps, block_frames, length of the character set
+_HEADER = struct.Struct("<4sHHHHdII")
+# frame count, index offset, block count, end magic
+_TRAILER = struct.Struct("<QQI4s")
+
+# About two seconds of video per block at typical frame rates
+DEFAULT_BLOCK_FRAMES = 48
+
+
+def _frame_layout(rows, cols, flags):
+    """Return (index dtype, index bytes, total bytes) of one frame."""
+    dtype = np.dtype("<u2") if flags & FLAG_WIDE_INDICES else np.dtype(np.uint8)
+    index_bytes = rows * cols * dtype.itemsize
+    color_bytes = rows * cols * 3 if flags & FLAG_COLORS else 0
+    return dtype, index_bytes, index_bytes + color_bytes
+
+
+class TextArchiveWriter:
+    """
+    Write character-grid frames to a .ascv archive.
+
+    Args:
+        path: output file
+        rows, cols: grid size of every frame
+        fps: frame rate
+        chars: character set the indices refer to
+        colors: whether frames carry (rows, cols, 3) cell colors
+        block_frames: frames per compressed block (seek granularity)
+        level: zlib compression level
+    """
+
+    def __init__(self, path, rows, cols, fps, chars, colors=False, block_frames=DEFAULT_BLOCK_FRAMES, level=6):
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.fps = fps
+        self.chars = chars
+        self.level = level
+        self.block_frames = block_frames
+        self.flags = (FLAG_COLORS if colors else 0) | (FLAG_WIDE_INDICES if len(chars) > 256 else 0)
+        self.index_dtype, self.index_bytes, self.frame_bytes = _frame_layout(rows, cols, self.flags)
+        self.frame_count = 0
+        self.raw_bytes = 0
+
+        self._block = []
+        self._offsets = []
+        self._file = open(path, "wb")
+        chars_data = "".join(chars).encode("utf-8")
+        self._file.write(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, self.flags, rows, cols, float(fps), block_frames, len(chars_data)))
+        self._file.write(chars_data)
+
+    def write_frame(self, indices, colors=None):
+        """Append one frame: (rows, cols) indices and, for colored archives, (rows, cols, 3) colors."""
+        if indices.shape != (self.rows, self.cols):
+            raise ValueError(f"Frame grid {indices.shape} does not match archive grid {(self.rows, self.cols)}")
+        if (colors is not None) != bool(self.flags & FLAG_COLORS):
+            raise ValueError("Frame colors must be given exactly when the archive has colors")
+
+        record = np.empty(self.frame_bytes, dtype=np.uint8)
+        record[:self.index_bytes] = np.ascontiguousarray(indices, dtype=self.index_dtype).view(np.uint8).ravel()
+        if colors is not None:
+            record[self.index_bytes:] = np.asarray(colors, dtype=np.uint8).ravel()
+        self._block.append(record)
+        self.frame_count += 1
+
+        if len(self._block) == self.block_frames:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        block = np.stack(self._block)
+        self._block = []
+        # Delta against the previous frame; decoding is a cumulative XOR
+        block[1:] ^= block[:-1].copy()
+        self._offsets.append(self._file.tell())
+        self._file.write(zlib.compress(block.tobytes(), self.level))
+        self.raw_bytes += block.nbytes
+
+    def close(self):
+        """Write the last block, the index and the trailer."""
+        if self._file is None:
+            return
+        self._flush_block()
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._offsets + [index_offset], dtype="<u8").tobytes())
+        self._file.write(_TRAILER.pack(self.frame_count, index_offset, len(self._offsets), ARCHIVE_END_MAGIC))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class TextArchiveReader:
+    """
+    Random-access reader for .ascv archives.
+
+    The file is memory mapped; frame(i) finds the block through the index in
+    constant time and decompresses only that block (the last decoded block is
+    kept, so sequential reads decompress every block once).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _HEADER.size + _TRAILER.size:
+            raise ValueError(f"{path} is not a text archive")
+        magic, version, self.flags, self.rows, self.cols, self.fps, self.block_frames, chars_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a text archive")
+        if version != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported text archive version {version}")
+        chars_start = _HEADER.size
+        self.chars = list(bytes(self._mmap[chars_start:chars_start + chars_len]).decode("utf-8"))
+
+        self.frame_count, index_offset, num_blocks, end_magic = _TRAILER.unpack_from(self._mmap, len(self._mmap) - _TRAILER.size)
+        if end_magic != ARCHIVE_END_MAGIC:
+            raise ValueError(f"{path} is truncated (no index)")
+        self._offsets = np.frombuffer(self._mmap, dtype="<u8", count=num_blocks + 1, offset=index_offset)
+
+        self.index_dtype, self.index_bytes, self.frame_bytes = _frame_layout(self.rows, self.cols, self.flags)
+        self._block_number = None
+        self._block = None
+
+    @property
+    def has_colors(self):
+        return bool(self.flags & FLAG_COLORS)
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps if self.fps else 0.0
+
+    def __len__(self):
+        return self.frame_count
+
+    def _load_block(self, block_number):
+        if block_number != self._block_number:
+            start, end = int(self._offsets[block_number]), int(self._offsets[block_number + 1])
+            data = np.frombuffer(zlib.decompress(self._mmap[start:end]), dtype=np.uint8)
+            self._block = np.bitwise_xor.accumulate(data.reshape(-1, self.frame_bytes), axis=0)
+            self._block_number = block_number
+        return self._block
+
+    def frame(self, i):
+        """Return (indices, colors) of frame i; colors is None without colors."""
+        if not 0 <= i < self.frame_count:
+            raise IndexError(f"Frame {i} out of range (0-{self.frame_count - 1})")
+        record = self._load_block(i // self.block_frames)[i % self.block_frames]
+        indices = record[:self.index_bytes].view(self.index_dtype).reshape(self.rows, self.cols)
+        colors = None
+        if self.has_colors:
+            colors = record[self.index_bytes:].reshape(self.rows, self.cols, 3)
+        return indices, colors
+
+    def frame_index(self, t):
+        """Index of the frame shown at time t (seconds), clamped to the archive."""
+        return min(max(int(t * self.fps), 0), max(self.frame_count - 1, 0))
+
+    def frame_at(self, t):
+        """Return (indices, colors) of the frame shown at time t (seconds)."""
+        return self.frame(self.frame_index(t))
+
+    def text(self, i):
+        """Frame i as text (with ANSI colors for colored archives)."""
+        indices, colors = self.frame(i)
+        if colors is None:
+            return indices_to_text(indices, self.chars)
+        return cells_to_ansi_text(indices, colors, self.chars)
+
+    def iter_frames(self, start=0):
+        """Yield (indices, colors) from frame start to the end."""
+        for i in range(start, self.frame_count):
+            yield self.frame(i)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    def close(self):
+        self._offsets = None
+        self._block = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def play_archive(path, start=0.0, diff_redraw=False):
+    """Play an archive in the terminal from start seconds."""
+    from terminal_common import TerminalPlayer, TerminalSink, DiffTerminalSink
+
+    with TextArchiveReader(path) as reader:
+        print(f"Grid: {reader.cols}x{reader.rows}, {reader.frame_count} frames at {reader.fps:.2f} fps")
+        sink = DiffTerminalSink(reader.chars) if diff_redraw else TerminalSink(reader.chars)
+        player = TerminalPlayer(reader.fps, sink)
+        player.cells_per_frame = reader.rows * reader.cols
+        # Frames are already character grids
+        player.play(reader.iter_frames(reader.frame_index(start)), lambda cells: cells)
+        player.print_report()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Play or inspect a text-video archive (.ascv)")
+    parser.add_argument("input", help="Path to .ascv archive")
+    parser.add_argument("--start", type=float, default=0.0, help="Start playback at this time in seconds")
+    parser.add_argument("--diff-redraw", action="store_true", help="Only send cells that changed since the previous frame")
+    parser.add_argument("--info", action="store_true", help="Print archive information instead of playing")
+    parser.add_argument("--frame-text", type=float, default=None, metavar="SECONDS", help="Print the frame at this time as text")
+    args = parser.parse_args()
+
+    try:
+        if args.info or args.frame_text is not None:
+            with TextArchiveReader(args.input) as reader:
+                if args.frame_text is not None:
+                    print(reader.text(reader.frame_index(args.frame_text)))
+                    return
+                raw = reader.frame_count * reader.frame_bytes
+                size = os.path.getsize(args.input)
+                print(f"Grid: {reader.cols}x{reader.rows} ({len(reader.chars)} characters{', colors' if reader.has_colors else ''})")
+                print(f"Frames: {reader.frame_count} at {reader.fps:.2f} fps ({reader.duration:.1f}s), {reader.block_frames} per block")
+                print(f"Size: {size / 1024:.1f} KiB ({raw / max(size, 1):.1f}x smaller than raw grids)")
+            return
+        play_archive(args.input, args.start, args.diff_redraw)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
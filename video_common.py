@@ -0,0 +1,409 @@
+"""
+Common utilities for video loading and encoding shared by the ASCII and emoji
+video generators and the server.
+"""
+import os
+import json
+import queue
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# --- MOVIEPY IMPORT HANDLER (Handles v1.0 and v2.0) ---
+try:
+    from moviepy.editor import VideoFileClip, ImageSequenceClip
+except ImportError:
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+    from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
+
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from moviepy.video.io.ffmpeg_tools import ffmpeg_merge_video_audio
+
+from profile_common import TraceRecorder, stage, traced_frames
+
+
+def get_video_rotation(video_path):
+    """
+    Get rotation metadata from video file using ffprobe.
+    Returns rotation angle in degrees (0, 90, 180, 270) or 0 if not found.
+    """
+    try:
+        cmd = [
+            'ffprobe', '-v', 'quiet', '-print_format', 'json',
+            '-show_streams', '-select_streams', 'v:0', video_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout)
+        
+        if 'streams' in data and len(data['streams']) > 0:
+            stream = data['streams'][0]
+            # Check for rotation in tags or side_data_list
+            rotation = 0
+            if 'tags' in stream and 'rotate' in stream['tags']:
+                rotation = int(stream['tags']['rotate'])
+            elif 'side_data_list' in stream:
+                for side_data in stream['side_data_list']:
+                    if side_data.get('rotation'):
+                        rotation = side_data['rotation']
+                        break
+            
+            # Normalize rotation to 0, 90, 180, 270
+            rotation = rotation % 360
+            if rotation not in [0, 90, 180, 270]:
+                rotation = 0
+            return rotation
+    except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError, ValueError):
+        pass
+    
+    return 0
+
+
+def prepare_clip(clip, scale=1.0, video_path=None):
+    """
+    Apply the scale factor and account for rotation metadata.
+    Returns (clip, w, h, swap_dims) where w x h is the displayed frame size.
+    """
+    # Resize Logic (MoviePy 1 vs 2 compatibility)
+    if scale != 1.0:
+        try:
+            clip = clip.resize(scale)
+        except AttributeError:
+            clip = clip.resized(scale)
+
+    w, h = clip.size
+    
+    # Account for video rotation metadata (swap dimensions if rotated 90/270 degrees)
+    rotation = 0
+    swap_dims = False
+    if video_path:
+        rotation = get_video_rotation(video_path)
+        print(f"Video rotation: {rotation}°")
+        if rotation in [90, 270]:
+            print(f"Swapping dimensions for rotation: {w}x{h} -> {h}x{w}")
+            w, h = h, w
+            swap_dims = True
+
+    return clip, w, h, swap_dims
+
+
+class StreamingVideoWriter:
+    """
+    Encode frames with ffmpeg as soon as they are rendered.
+
+    Frames are piped straight into a video-only temporary file, so memory use
+    does not grow with the length of the clip. Audio (a moviepy AudioClip) is
+    written and muxed into the final output when the writer is closed.
+
+    Usage:
+        with StreamingVideoWriter(output_path, fps, audio=clip.audio) as writer:
+            for frame in frames:
+                writer.write_frame(frame)
+    """
+
+    def __init__(self, output_path, fps, audio=None, codec="libx264", audio_codec="aac"):
+        self.output_path = output_path
+        self.fps = fps
+        self.audio = audio
+        self.codec = codec
+        self.audio_codec = audio_codec
+        self.size = None
+        self.frame_count = 0
+        self._writer = None
+
+        # Temporary files live next to the output so the final rename stays on one filesystem
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        base, ext = os.path.splitext(os.path.basename(output_path))
+        self._video_tmp = os.path.join(out_dir, f"{base}_TEMP_video{ext or '.mp4'}")
+        self._audio_tmp = os.path.join(out_dir, f"{base}_TEMP_audio.m4a")
+
+    def write_frame(self, frame):
+        """Encode one RGB frame. The first frame fixes the output size."""
+        if self._writer is None:
+            h, w = frame.shape[:2]
+            self.size = (w, h)
+            self._writer = FFMPEG_VideoWriter(self._video_tmp, self.size, self.fps, codec=self.codec)
+        self._writer.write_frame(frame)
+        self.frame_count += 1
+
+    def close(self):
+        """Finish encoding and mux audio into the output file."""
+        if self._writer is None:
+            raise ValueError("No frames were written")
+        self._writer.close()
+        self._writer = None
+
+        if self.audio is not None:
+            print("Muxing audio...")
+            self.audio.write_audiofile(self._audio_tmp, codec=self.audio_codec, logger=None)
+            ffmpeg_merge_video_audio(self._video_tmp, self._audio_tmp, self.output_path, logger=None)
+        else:
+            os.replace(self._video_tmp, self.output_path)
+        self._cleanup()
+
+    def abort(self):
+        """Stop encoding and remove temporary files without producing output."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._cleanup()
+
+    def _cleanup(self):
+        for path in (self._video_tmp, self._audio_tmp):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+# Per-process state for render workers, set once by the pool initializer so the
+# (large) options object and palette are not pickled with every frame
+_worker_render_func = None
+_worker_options = None
+_worker_tracer = None
+
+
+def _init_render_worker(render_func, options, trace=False):
+    global _worker_render_func, _worker_options, _worker_tracer
+    _worker_render_func = render_func
+    _worker_options = options
+    if trace:
+        _worker_tracer = TraceRecorder(process_name=f"render worker {os.getpid()}")
+        _worker_tracer.name_thread("render")
+
+
+def _render_in_worker(frame):
+    return _worker_render_func(frame, _worker_options)
+
+
+def _render_in_worker_traced(index, frame):
+    _worker_tracer.set_frame(index)
+    with _worker_tracer.stage("render"):
+        rendered = _worker_render_func(frame, _worker_options, _worker_tracer)
+    return rendered, _worker_tracer.drain()
+
+
+def render_frames_parallel(frames, render_func, options, workers, max_in_flight=None, tracer=None):
+    """
+    Render frames on a process pool and yield the results in the original order.
+
+    Args:
+        frames: iterable of RGB frames (numpy arrays)
+        render_func: module-level function called as render_func(frame, options),
+            or render_func(frame, options, tracer) when tracing
+        options: options object shared by all workers (sent once per worker)
+        workers: number of worker processes
+        max_in_flight: maximum number of frames submitted but not yet yielded
+            (default: 2 * workers). Bounds memory use when decoding outpaces rendering.
+        tracer: optional TraceRecorder; workers record their spans and send them
+            back with each frame, and the number of frames in flight is counted
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+
+    def collect(index, future):
+        if tracer is None:
+            return future.result()
+        tracer.set_frame(index)
+        with tracer.stage("wait render"):
+            rendered, events = future.result()
+        tracer.extend(events)
+        tracer.counter("frames in flight", render=len(pending))
+        return rendered
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                             initargs=(render_func, options, tracer is not None)) as pool:
+        pending = deque()
+        for index, frame in enumerate(frames):
+            if tracer is None:
+                pending.append((index, pool.submit(_render_in_worker, frame)))
+            else:
+                pending.append((index, pool.submit(_render_in_worker_traced, index, frame)))
+            if len(pending) >= max_in_flight:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+
+def render_frames_batched(frames, render_batch, options, batch_size):
+    """
+    Group frames into batches, render each batch with render_batch(batch, options)
+    and yield the rendered frames one at a time, in order.
+    """
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield from render_batch(np.stack(batch), options)
+            batch = []
+    if batch:
+        yield from render_batch(np.stack(batch), options)
+
+
+# Marks the end of a pipeline queue
+_END_OF_STREAM = object()
+
+
+class FramePipeline:
+    """
+    Three-stage decode -> render -> encode pipeline connected by bounded queues.
+
+    A decoder thread pulls frames from the source iterator, the calling thread
+    renders them and an encoder thread writes the results, so all three stages
+    overlap and throughput approaches that of the slowest stage. Queue
+    occupancy is sampled for every frame to show which stage is the bottleneck.
+
+    Args:
+        frames: iterable of decoded frames (e.g. clip.iter_frames())
+        render_frames: function mapping an iterable of decoded frames to an
+            iterable of rendered frames, in order
+        write_frame: function called with every rendered frame (e.g. writer.write_frame)
+        queue_size: capacity of each of the two queues
+        tracer: optional TraceRecorder for decode, queue wait and encode spans
+            and queue depth counters
+    """
+
+    def __init__(self, frames, render_frames, write_frame, queue_size=8, tracer=None):
+        self.frames = frames
+        self.render_frames = render_frames
+        self.write_frame = write_frame
+        self.queue_size = queue_size
+        self.tracer = tracer
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.encode_queue = queue.Queue(maxsize=queue_size)
+        self.frame_count = 0
+        self._occupancy = []  # (decode_queue, encode_queue) sizes sampled per frame
+        self._errors = []
+        self._stop = threading.Event()
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def _put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        """Blocking get that returns _END_OF_STREAM once the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END_OF_STREAM
+
+    def _decode(self):
+        frames = self.frames
+        if self.tracer is not None:
+            self.tracer.name_thread("decoder")
+            frames = traced_frames(frames, self.tracer)
+        try:
+            for frame in frames:
+                if not self._put(self.decode_queue, frame):
+                    return
+            self._put(self.decode_queue, _END_OF_STREAM)
+        except Exception as e:
+            self._fail(e)
+
+    def _encode(self):
+        if self.tracer is not None:
+            self.tracer.name_thread("encoder")
+        try:
+            index = 0
+            while True:
+                with stage(self.tracer, "wait frame"):
+                    frame = self._get(self.encode_queue)
+                if frame is _END_OF_STREAM:
+                    return
+                if self.tracer is not None:
+                    self.tracer.set_frame(index)
+                with stage(self.tracer, "encode"):
+                    self.write_frame(frame)
+                index += 1
+        except Exception as e:
+            self._fail(e)
+
+    def _decoded_frames(self):
+        index = 0
+        while True:
+            with stage(self.tracer, "wait decode"):
+                frame = self._get(self.decode_queue)
+            if frame is _END_OF_STREAM:
+                return
+            self._occupancy.append((self.decode_queue.qsize(), self.encode_queue.qsize()))
+            if self.tracer is not None:
+                self.tracer.set_frame(index)
+                self.tracer.counter("queue depth", decode=self._occupancy[-1][0], encode=self._occupancy[-1][1])
+            yield frame
+            index += 1
+
+    def run(self, progress=None):
+        """
+        Run the pipeline to completion. Re-raises the first error from any stage.
+        progress: optional tqdm instance, updated once per rendered frame.
+        Returns the number of frames rendered.
+        """
+        if self.tracer is not None:
+            self.tracer.name_thread("renderer")
+        decoder = threading.Thread(target=self._decode, name="decoder", daemon=True)
+        encoder = threading.Thread(target=self._encode, name="encoder", daemon=True)
+        decoder.start()
+        encoder.start()
+        try:
+            for rendered in self.render_frames(self._decoded_frames()):
+                with stage(self.tracer, "wait encode"):
+                    queued = self._put(self.encode_queue, rendered)
+                if not queued:
+                    break
+                self.frame_count += 1
+                if progress is not None:
+                    progress.update(1)
+            self._put(self.encode_queue, _END_OF_STREAM)
+        except Exception as e:
+            self._fail(e)
+        encoder.join()
+        # Unblock the decoder if rendering stopped early
+        self._stop.set()
+        decoder.join()
+        if self._errors:
+            raise self._errors[0]
+        return self.frame_count
+
+    def occupancy(self):
+        """Return mean fill ratio (0-1) of the decode and encode queues."""
+        if not self._occupancy:
+            return 0.0, 0.0
+        samples = np.array(self._occupancy, dtype=np.float64) / self.queue_size
+        decode_fill, encode_fill = samples.mean(axis=0)
+        return float(decode_fill), float(encode_fill)
+
+    def print_report(self):
+        """Print queue occupancy and the stage that is most likely the bottleneck."""
+        decode_fill, encode_fill = self.occupancy()
+        print(f"Queue occupancy: decode {decode_fill:.0%}, encode {encode_fill:.0%} (capacity {self.queue_size})")
+        # A full queue means its consumer cannot keep up; an empty decode queue
+        # means the renderer is starved by the decoder
+        if encode_fill >= 0.5:
+            bottleneck = "encode"
+        elif decode_fill >= 0.5:
+            bottleneck = "render"
+        else:
+            bottleneck = "decode"
+        print(f"Bottleneck: {bottleneck}")